@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from core.constants import AUTH_TOKEN_CACHE_TIMEOUT
+from core.metrics import increment
+from users.service import (get_auth_version, get_cached_auth_version,
+                           get_token_cache_key, get_user_snapshot,
+                           restore_user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который помнит в кеше владельца токена.
+
+    В записи кеша лежат снимок пользователя без пароля
+    (get_user_snapshot) и метка его учётной записи (get_auth_version).
+    Если метка в кеше совпадает, пользователь восстанавливается из
+    снимка без запросов к БД. Метку сбрасывают сигналы сохранения и
+    удаления пользователя и удаления токена, поэтому смена пароля,
+    блокировка и выход должны проходить через save() и delete(), а класс
+    включается настройкой AUTH_TOKEN_CACHE только вместе с кешем, общим
+    для всех процессов.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = get_token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            snapshot, version = cached
+            if (snapshot['is_active'] and version is not None
+                    and get_cached_auth_version(snapshot['id']) == version):
+                increment('auth.token_cache.hit')
+                user = restore_user(snapshot)
+                return user, self.get_model()(key=key, user=user)
+        increment('auth.token_cache.miss')
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, (get_user_snapshot(user),
+                              get_auth_version(user.pk)),
+                  AUTH_TOKEN_CACHE_TIMEOUT)
+        return user, token
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Кеши, которые каждый процесс держит у себя.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_auth_token_cache(app_configs, **kwargs):
+    if (settings.AUTH_TOKEN_CACHE
+            and settings.CACHES['default']['BACKEND']
+            in PROCESS_LOCAL_CACHES):
+        return [Error(
+            'AUTH_TOKEN_CACHE требует кеша, общего для всех процессов.',
+            hint='Задайте CACHE_BACKEND (например, Redis или Memcached) '
+                 'или отключите AUTH_TOKEN_CACHE.',
+            id='api.E001',
+        )]
+    return []
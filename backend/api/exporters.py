@@ -0,0 +1,54 @@
+import csv
+from itertools import chain, islice
+
+from django.conf import settings
+
+from core.constants import SHOPPING_LIST_CHUNK_SIZE
+from core.pdf import iter_pdf
+
+SHOPPING_LIST_TITLE = 'Список покупок:'
+CSV_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def chunked(rows, size=SHOPPING_LIST_CHUNK_SIZE):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def format_line(name, unit, total_amount):
+    return f'{name} ({unit}) — {total_amount}'
+
+
+def iter_txt(rows):
+    yield SHOPPING_LIST_TITLE
+    for chunk in chunked(rows):
+        yield ''.join(f'\n{format_line(*row)}' for row in chunk)
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for chunk in chunked(rows):
+        yield ''.join(writer.writerow(row) for row in chunk)
+
+
+def iter_pdf_lines(rows):
+    lines = chain(
+        (SHOPPING_LIST_TITLE,), (format_line(*row) for row in rows)
+    )
+    return iter_pdf(lines, settings.SHOPPING_LIST_PDF_FONT)
+
+
+SHOPPING_LIST_EXPORTERS = {
+    'txt': iter_txt,
+    'csv': iter_csv,
+    'pdf': iter_pdf_lines,
+}
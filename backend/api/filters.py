@@ -1,15 +1,20 @@
 from django_filters import rest_framework
 
+from core.constants import RECIPE_ORDERINGS
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search_ingredients
 
 
 class IngredientFilter(rest_framework.FilterSet):
-    name = rest_framework.CharFilter(lookup_expr='icontains')
+    name = rest_framework.CharFilter(method='search_name')
 
     class Meta:
         model = Ingredient
         fields = ('name', 'measurement_unit')
 
+    def search_name(self, queryset, name, value):
+        return search_ingredients(queryset, value)
+
 
 class RecipeFilter(rest_framework.FilterSet):
     tags = rest_framework.ModelMultipleChoiceFilter(
@@ -21,10 +26,15 @@ class RecipeFilter(rest_framework.FilterSet):
         method='is_favorited_filter')
     is_in_shopping_cart = rest_framework.BooleanFilter(
         method='is_in_shopping_cart_filter')
+    ordering = rest_framework.ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method='order_by'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'ordering')
 
     def is_favorited_filter(self, queryset, name, value):
         user = self.request.user
@@ -37,3 +47,6 @@ class RecipeFilter(rest_framework.FilterSet):
         if value and user.is_authenticated:
             return queryset.filter(shopping_cart__user=user)
         return queryset
+
+    def order_by(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
@@ -0,0 +1,76 @@
+import time
+from hashlib import md5
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from core.constants import RESPONSE_CACHE_TIMEOUT
+from core.versions import get_version
+
+RESPONSE_CACHE_KEY = 'response:{}'
+
+
+class CachedResponseMixin:
+    """Кеширует готовые JSON-ответы read-only вьюсета.
+
+    Ключом служит версия данных `cache_version_name` и полный путь
+    запроса. Условные запросы с актуальными If-None-Match или
+    If-Modified-Since получают 304 без обращения к базе и сериализаторам.
+    """
+
+    cache_version_name = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, lambda: super(CachedResponseMixin, self).list(
+                request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, lambda: super(CachedResponseMixin, self).retrieve(
+                request, *args, **kwargs)
+        )
+
+    def get_cached_response(self, request, get_response):
+        if request.accepted_renderer.format != 'json':
+            return get_response()
+        version = get_version(self.cache_version_name)
+        etag = '"{}"'.format(md5(
+            f'{version}:{request.get_full_path()}'.encode()
+        ).hexdigest())
+        if self.is_not_modified(request, etag, version):
+            response = HttpResponseNotModified()
+        else:
+            key = RESPONSE_CACHE_KEY.format(etag)
+            content = cache.get(key)
+            if content is None:
+                response = get_response()
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                content = JSONRenderer().render(response.data)
+                cache.set(key, content, RESPONSE_CACHE_TIMEOUT)
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        # Метка, сдвинутая вперёд при частых изменениях, может быть ещё в
+        # будущем; такой Last-Modified отдавать нельзя (RFC 7232, 2.2.1).
+        if version <= time.time():
+            response['Last-Modified'] = http_date(version)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    @staticmethod
+    def is_not_modified(request, etag, version):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return etag in etags or '*' in etags
+        if_modified_since = parse_http_date_safe(
+            request.headers.get('If-Modified-Since'))
+        # Метки — целые секунды, как и дата в заголовке.
+        return (if_modified_since is not None
+                and version <= if_modified_since)
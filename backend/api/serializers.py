@@ -1,11 +1,17 @@
 from django.db import transaction
-from drf_base64.fields import Base64ImageField
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 
-from core.constants import INGREDIENT_MIN_AMOUNT, MAX_POSITIVE_VALUE
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
-from users.models import Subscribe, User
+from core.constants import (BULK_RELATIONS_MAX_SIZE, INGREDIENT_MIN_AMOUNT,
+                            MAX_ID_VALUE, MAX_POSITIVE_VALUE,
+                            RECIPE_IMAGE_RENDITIONS)
+from core.images import Base64ImageField, RenditionImageField, SrcsetField
+from core.renditions import is_same_upload
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.service import (get_recipes_by_author, get_recipes_limit,
+                             refresh_recipe_in_shopping_lists,
+                             suspend_recipe_touch)
+from users.models import User
 from users.serializers import UserSerializer
 
 
@@ -23,6 +29,8 @@ class AvatarSerializer(serializers.ModelSerializer):
 
 
 class SimpleRecipeSerializer(serializers.ModelSerializer):
+    image = RenditionImageField('card')
+
     class Meta:
         model = Recipe
         fields = ('id', 'name',
@@ -31,46 +39,18 @@ class SimpleRecipeSerializer(serializers.ModelSerializer):
 
 class SubscribeGETSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(default=0)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        queryset = obj.recipes.all()
-        if recipes_limit:
-            try:
-                recipes_limit = int(recipes_limit)
-            except ValueError:
-                recipes_limit = None
-            queryset = queryset[:recipes_limit]
-        return SimpleRecipeSerializer(queryset, many=True,
-                                      context=self.context).data
-
-
-class SubscribePOSTSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Subscribe
-        fields = ('user', 'author')
-
-    def validate(self, data):
-        user = self.context['request'].user
-        author = data['author']
-        if user == author:
-            raise serializers.ValidationError(
-                'Нельзя подписаться на самого себя.'
+        recipes_by_author = self.context.get('recipes_by_author')
+        if recipes_by_author is None:
+            recipes_by_author = get_recipes_by_author(
+                (obj.id,), get_recipes_limit(self.context['request'])
             )
-        if user.user_subscriptions.filter(author=author).exists():
-            raise serializers.ValidationError(
-                'Вы уже подписаны на этого автора.'
-            )
-        return data
-
-    def to_representation(self, instance):
-        return SubscribeGETSerializer(instance.author,
-                                      context=self.context).data
+        return SimpleRecipeSerializer(recipes_by_author.get(obj.id, ()),
+                                      many=True, context=self.context).data
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -107,22 +87,23 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.BooleanField(read_only=True,
                                                    default=0)
     image = Base64ImageField()
+    srcset = SrcsetField(RECIPE_IMAGE_RENDITIONS, source='image')
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags',
                   'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image',
+                  'name', 'image', 'srcset',
                   'text', 'cooking_time')
 
 
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
     """Сериализатор ингредиента для создания рецепта."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(), source='ingredient'
-    )
+    # Ингредиенты ищутся одним запросом в RecipeCreateSerializer.
+    id = serializers.IntegerField(source='ingredient', min_value=1,
+                                  max_value=MAX_ID_VALUE)
     amount = serializers.IntegerField(
         min_value=INGREDIENT_MIN_AMOUNT, max_value=MAX_POSITIVE_VALUE,
         error_messages={
@@ -141,9 +122,10 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Сериализатор создания рецепта."""
 
-    tags = serializers.PrimaryKeyRelatedField(many=True,
-                                              queryset=Tag.objects.all(),
-                                              allow_empty=False)
+    tags = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_ID_VALUE),
+        allow_empty=False
+    )
     author = UserSerializer(read_only=True)
     ingredients = RecipeIngredientCreateSerializer(many=True,
                                                    allow_empty=False)
@@ -178,6 +160,28 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
         return data
 
+    @staticmethod
+    def get_objects(model, ids, message):
+        """Объекты по списку id одним запросом; сообщает о всех ненайденных."""
+        found = model.objects.in_bulk(set(ids))
+        missing = sorted(set(ids) - found.keys())
+        if missing:
+            raise serializers.ValidationError(
+                message + ', '.join(map(str, missing)) + '.')
+        return [found[pk] for pk in ids]
+
+    def validate_tags(self, tag_ids):
+        return self.get_objects(Tag, tag_ids, 'Не найдены теги с id: ')
+
+    def validate_ingredients(self, ingredients):
+        found = self.get_objects(
+            Ingredient, [item['ingredient'] for item in ingredients],
+            'Не найдены ингредиенты с id: '
+        )
+        for item, ingredient in zip(ingredients, found):
+            item['ingredient'] = ingredient
+        return ingredients
+
     def validate_image(self, img):
         if not img:
             raise serializers.ValidationError(
@@ -205,44 +209,86 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         self.add_ingredients(recipe, ingredients)
         return recipe
 
+    @staticmethod
+    def update_tags(recipe, tags):
+        current = set(recipe.tags.values_list('id', flat=True))
+        new = {tag.id for tag in tags}
+        if current - new:
+            recipe.tags.remove(*(current - new))
+        if new - current:
+            recipe.tags.add(*(new - current))
+        return current != new
+
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        """Применяет только отличия; возвращает id изменённых ингредиентов."""
+        current = {item.ingredient_id: item
+                   for item in recipe.recipe_ingredients.all()}
+        new = {item['ingredient'].id: item['amount'] for item in ingredients}
+        removed = current.keys() - new.keys()
+        changed = [
+            item for ingredient_id, item in current.items()
+            if ingredient_id in new and item.amount != new[ingredient_id]
+        ]
+        for item in changed:
+            item.amount = new[item.ingredient_id]
+        if removed:
+            # update() сам сдвигает updated_at рецепта и обновляет списки
+            # покупок, поэтому сигналы удалённых строк рецепт не трогают.
+            with suspend_recipe_touch(recipe):
+                RecipeIngredient.objects.filter(
+                    recipe=recipe, ingredient_id__in=removed).delete()
+        RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id,
+                             amount=amount)
+            for ingredient_id, amount in new.items()
+            if ingredient_id not in current
+        ])
+        return (removed | (new.keys() - current.keys())
+                | {item.ingredient_id for item in changed})
+
     @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        instance.ingredients.clear()
-        instance.tags.set(tags)
-        self.add_ingredients(instance, ingredients)
-        return super().update(instance, validated_data)
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        image = validated_data.get('image')
+        if image and is_same_upload(instance.image, image):
+            # Клиент прислал ту же картинку, что уже сохранена.
+            del validated_data['image']
+        update_fields = [
+            field for field, value in validated_data.items()
+            if field == 'image' or getattr(instance, field) != value
+        ]
+        tags_changed = tags is not None and self.update_tags(instance, tags)
+        ingredient_ids = (set() if ingredients is None
+                          else self.update_ingredients(instance, ingredients))
+        if ingredient_ids:
+            refresh_recipe_in_shopping_lists(instance, ingredient_ids)
+        if update_fields or tags_changed or ingredient_ids:
+            for field in update_fields:
+                setattr(instance, field, validated_data[field])
+            # updated_at сдвигается всегда: он же сбрасывает кеш карточки.
+            instance.save(update_fields=update_fields + ['updated_at'])
+        return instance
 
     def to_representation(self, instance):
+        # После записи кеш prefetch сброшен: ингредиенты — одним запросом.
+        prefetch_related_objects([instance], Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ))
         return RecipeSerializer(instance, context=self.context).data
 
 
-class BaseFavoriteCartSerializer(serializers.ModelSerializer):
-    def validate(self, data):
-        user = data['user']
-        recipe = data['recipe']
-        model = self.Meta.model
-        if model.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError(
-                f'Рецепт уже в {model._meta.verbose_name}.'
-            )
-        return data
-
-    def to_representation(self, instance):
-        return SimpleRecipeSerializer(instance.recipe,
-                                      context=self.context).data
+class IdListSerializer(serializers.Serializer):
+    """Список id для массового добавления или удаления связей."""
 
-
-class FavoriteSerializer(BaseFavoriteCartSerializer):
-
-    class Meta:
-        model = Favorite
-        fields = ('user', 'recipe')
-
-
-class ShoppingCartSerializer(BaseFavoriteCartSerializer):
-
-    class Meta:
-        model = ShoppingCart
-        fields = ('user', 'recipe')
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_ID_VALUE),
+        allow_empty=False, max_length=BULK_RELATIONS_MAX_SIZE,
+        error_messages={
+            'max_length': 'За один запрос можно передать не больше '
+            '{max_length} id.'
+        }
+    )
@@ -1,32 +1,89 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Exists, F, OuterRef, Sum
-from django.http import FileResponse
+from django.db.models import Exists, OuterRef
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from api.exporters import SHOPPING_LIST_EXPORTERS
+from api.feed import get_recipe_feed, with_related
 from api.filters import IngredientFilter, RecipeFilter
+from api.mixins import CachedResponseMixin
 from api.permissions import IsAuthorOrReadOnly
-from api.serializers import (FavoriteSerializer, IngredientSerializer,
+from api.renderers import (CsvShoppingListRenderer, PdfShoppingListRenderer,
+                           TxtShoppingListRenderer)
+from api.serializers import (IdListSerializer, IngredientSerializer,
                              RecipeCreateSerializer, RecipeSerializer,
-                             ShoppingCartSerializer, SubscribeGETSerializer,
-                             SubscribePOSTSerializer, TagSerializer)
-from core.constants import FILE_NAME
-from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+                             SimpleRecipeSerializer, SubscribeGETSerializer,
+                             TagSerializer)
+from core.constants import (FILE_NAME, INGREDIENTS_VERSION,
+                            SHOPPING_LIST_CHUNK_SIZE, TAGS_VERSION)
+from core.metrics import snapshot
+from core.pagination import FoodgramCursorPaginator, get_ordering
+from core.relations import (add_relation, add_relations, delete_relation,
+                            delete_relations)
+from recipes.ingredient_index import get_ingredient_index
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.search import limit_search_results
+from recipes.service import get_recipes_by_author, get_recipes_limit
+from users.models import Subscribe
 from users.serializers import AvatarSerializer, UserSerializer
 
 User = get_user_model()
 
 
+def non_field_error(message):
+    # Тот же формат ответа, что и у ошибок из Serializer.validate.
+    return ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]})
+
+
+def change_relations(request, model, target, add, excluded=()):
+    """Массово добавляет или удаляет связи пользователя с объектами.
+
+    Для каждого id возвращает статус, который вернул бы запрос к
+    одиночному эндпоинту: 201/204, 400 или 404.
+    """
+    serializer = IdListSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = list(dict.fromkeys(serializer.validated_data['ids']))
+    allowed = [pk for pk in ids if pk not in excluded]
+    link = model._meta.get_field(target)
+    if add:
+        done = {
+            getattr(instance, link.attname) for instance in
+            add_relations(model, target, allowed, user=request.user)
+        }
+    else:
+        done = set(delete_relations(model, target, allowed,
+                                    user=request.user))
+    rest = set(ids) - done
+    existing = set(link.related_model.objects.filter(pk__in=rest).values_list(
+        'pk', flat=True)) if rest else set()
+    success = status.HTTP_201_CREATED if add else status.HTTP_204_NO_CONTENT
+    return Response({'results': [
+        {'id': pk, 'status': (
+            success if pk in done
+            else status.HTTP_400_BAD_REQUEST if pk in existing
+            else status.HTTP_404_NOT_FOUND
+        )}
+        for pk in ids
+    ]})
+
+
 class UserViewSet(DjoserUserViewSet):
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = UserSerializer
+    pagination_class = FoodgramCursorPaginator
 
     @action(detail=False, methods=('get',),
             permission_classes=(IsAuthenticated,))
@@ -38,35 +95,47 @@ class UserViewSet(DjoserUserViewSet):
     def subscriptions(self, request):
         queryset = User.objects.filter(
             subscriptions_to_author__user=request.user
-        ).annotate(recipes_count=Count('recipes')).order_by('username')
+        ).order_by('username', 'id')
         page = self.paginate_queryset(queryset)
-        serializer = SubscribeGETSerializer(page, many=True,
-                                            context={'request': request})
+        recipes_by_author = get_recipes_by_author(
+            [author.id for author in page], get_recipes_limit(request)
+        )
+        serializer = SubscribeGETSerializer(
+            page, many=True,
+            context={'request': request,
+                     'recipes_by_author': recipes_by_author}
+        )
         return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=('post',),
             permission_classes=(IsAuthenticated,))
     def subscribe(self, request, id=None):
-        author = get_object_or_404(User, id=id)
-        serializer = SubscribePOSTSerializer(
-            data={'user': request.user.id, 'author': author.id},
-            context=self.get_serializer_context()
+        if str(request.user.id) == id:
+            raise non_field_error('Нельзя подписаться на самого себя.')
+        if not add_relation(Subscribe, 'author', id, user=request.user):
+            get_object_or_404(User, id=id)
+            raise non_field_error('Вы уже подписаны на этого автора.')
+        serializer = SubscribeGETSerializer(
+            User.objects.get(id=id), context=self.get_serializer_context()
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, id=None):
-        author = get_object_or_404(User, id=id)
-        deleted, _ = request.user.user_subscriptions.filter(
-            author=author).delete()
-        return Response(
-            status=(
-                status.HTTP_204_NO_CONTENT if deleted
-                else status.HTTP_400_BAD_REQUEST
-            )
-        )
+        if not delete_relation(Subscribe, 'author', id, user=request.user):
+            get_object_or_404(User, id=id)
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=('post',), url_path='bulk/subscribe',
+            permission_classes=(IsAuthenticated,))
+    def bulk_subscribe(self, request):
+        return change_relations(request, Subscribe, 'author', add=True,
+                                excluded=(request.user.id,))
+
+    @bulk_subscribe.mapping.delete
+    def bulk_unsubscribe(self, request):
+        return change_relations(request, Subscribe, 'author', add=False)
 
     @action(detail=False, methods=('put',), url_path='me/avatar',
             permission_classes=(IsAuthenticated,))
@@ -80,12 +149,15 @@ class UserViewSet(DjoserUserViewSet):
     @avatar.mapping.delete
     def delete_avatar(self, request):
         user = request.user
-        user.avatar.delete(save=False)
-        user.save()
+        # Файл может быть общим с другими пользователями, его удалит
+        # collect_media_garbage.
+        user.avatar = None
+        user.save(update_fields=('avatar',))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    cache_version_name = INGREDIENTS_VERSION
     queryset = Ingredient.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = IngredientSerializer
@@ -93,8 +165,28 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Срез только для списка: detail-маршрут фильтрует ту же выборку
+        # и затем вызывает на ней get().
+        if self.action == 'list' and self.request.query_params.get('name'):
+            queryset = limit_search_results(queryset)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # Как CharFilter: пробелы по краям не участвуют в поиске.
+        name = request.query_params.get('name', '').strip()
+        if not name:
+            return super().list(request, *args, **kwargs)
+        return self.get_cached_response(
+            request, lambda: Response(get_ingredient_index().search(
+                name, request.query_params.get('measurement_unit')
+            ))
+        )
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    cache_version_name = TAGS_VERSION
     queryset = Tag.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = TagSerializer
@@ -105,13 +197,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    pagination_class = FoodgramCursorPaginator
     http_method_names = ('get', 'post', 'patch', 'delete')
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Recipe.objects.select_related('author').prefetch_related(
-            'tags', 'ingredients'
-        )
+        queryset = with_related(Recipe.objects.all())
         if user.is_authenticated:
             queryset = queryset.annotate(
                 is_favorited=Exists(
@@ -123,67 +214,85 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(Recipe.objects.all())
+        page = self.paginate_queryset(queryset.values('id', 'updated_at', *{
+            field.lstrip('-') for field in get_ordering(queryset)
+        }))
+        return self.get_paginated_response(
+            get_recipe_feed(page, self.get_serializer_context())
+        )
+
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeSerializer
         return RecipeCreateSerializer
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (getattr(response, 'exception', False)
+                and self.action == 'download_shopping_cart'):
+            # Ошибка — не файл: отдаём её в JSON, а не с типом txt/csv/pdf.
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
     @action(detail=True, methods=('post',),
             permission_classes=(IsAuthenticated,))
     def favorite(self, request, pk=None):
-        return self.handle_favorite_or_cart(request, pk, FavoriteSerializer)
+        return self.add_to_user_list(request, pk, Favorite)
 
     @favorite.mapping.delete
     def delete_favorite(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        deleted, _ = request.user.favorites.filter(recipe=recipe).delete()
-        return Response(
-            status=(
-                status.HTTP_204_NO_CONTENT if deleted
-                else status.HTTP_400_BAD_REQUEST
-            )
-        )
+        return self.remove_from_user_list(request, pk, Favorite)
 
-    @action(detail=True, methods=('post',))
-    def shopping_cart(
-            self,
-            request,
-            pk=None,
-            permission_classes=(IsAuthenticated,)):
-        return self.handle_favorite_or_cart(
-            request, pk, ShoppingCartSerializer
-        )
+    @action(detail=True, methods=('post',),
+            permission_classes=(IsAuthenticated,))
+    def shopping_cart(self, request, pk=None):
+        return self.add_to_user_list(request, pk, ShoppingCart)
 
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        deleted, _ = request.user.shopping_carts.filter(recipe=recipe).delete()
-        return Response(
-            status=(
-                status.HTTP_204_NO_CONTENT if deleted
-                else status.HTTP_400_BAD_REQUEST
-            )
-        )
+        return self.remove_from_user_list(request, pk, ShoppingCart)
 
-    @action(detail=False, methods=('get',),
+    @action(detail=False, methods=('post',), url_path='bulk/favorite',
+            permission_classes=(IsAuthenticated,))
+    def bulk_favorite(self, request):
+        return change_relations(request, Favorite, 'recipe', add=True)
+
+    @bulk_favorite.mapping.delete
+    def bulk_delete_favorite(self, request):
+        return change_relations(request, Favorite, 'recipe', add=False)
+
+    @action(detail=False, methods=('post',), url_path='bulk/shopping_cart',
             permission_classes=(IsAuthenticated,))
+    def bulk_shopping_cart(self, request):
+        return change_relations(request, ShoppingCart, 'recipe', add=True)
+
+    @bulk_shopping_cart.mapping.delete
+    def bulk_delete_shopping_cart(self, request):
+        return change_relations(request, ShoppingCart, 'recipe', add=False)
+
+    @action(detail=False, methods=('get',),
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=(TxtShoppingListRenderer,
+                              CsvShoppingListRenderer,
+                              PdfShoppingListRenderer))
     def download_shopping_cart(self, request):
-        ingredients = (
-            RecipeIngredient.objects
-            .filter(recipe__shopping_cart__user=request.user)
-            .values(name=F('ingredient__name'),
-                    unit=F('ingredient__measurement_unit'))
-            .annotate(total_amount=Sum('amount'))
-            .order_by('name')
+        renderer = request.accepted_renderer
+        rows = (
+            request.user.shopping_list_items
+            .values_list('ingredient__name', 'ingredient__measurement_unit',
+                         'total_amount')
+            .order_by('ingredient__name')
+            .iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+        )
+        response = StreamingHttpResponse(
+            SHOPPING_LIST_EXPORTERS[renderer.format](rows),
+            content_type=renderer.media_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{FILE_NAME}.{renderer.format}"'
         )
-        file_list = [
-            f'{ingredient["name"]} ({ingredient["unit"]}) — '
-            f'{ingredient["total_amount"]}'
-            for ingredient in ingredients
-        ]
-        file_content = 'Список покупок:\n' + '\n'.join(file_list)
-        response = FileResponse(file_content, content_type='text/plain')
-        response['Content-Disposition'] = f'attachment; filename="{FILE_NAME}"'
         return response
 
     @action(detail=True, methods=('get',),
@@ -191,16 +300,32 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_link(self, request, pk=None):
         recipe = get_object_or_404(Recipe, pk=pk)
         short_url_path = reverse('redirect_to_original', kwargs={
-            'slug': recipe.short_url}
+            'slug': recipe.short_code}
         )
         short_link = request.build_absolute_uri(short_url_path)
         return Response({'short-link': short_link}, status=status.HTTP_200_OK)
 
-    def handle_favorite_or_cart(self, request, pk, serializer_class):
-        recipe = get_object_or_404(Recipe, id=pk)
-        serializer = serializer_class(
-            data={'user': request.user.id, 'recipe': recipe.id},
-            context=self.get_serializer_context())
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+    def add_to_user_list(self, request, pk, model):
+        if not add_relation(model, 'recipe', pk, user=request.user):
+            get_object_or_404(Recipe, id=pk)
+            raise non_field_error(f'Рецепт уже в {model._meta.verbose_name}.')
+        serializer = SimpleRecipeSerializer(
+            Recipe.objects.get(id=pk), context=self.get_serializer_context()
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def remove_from_user_list(request, pk, model):
+        if not delete_relation(model, 'recipe', pk, user=request.user):
+            get_object_or_404(Recipe, id=pk)
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MetricsView(APIView):
+    """Счётчики и тайминги процесса, обслужившего запрос."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(snapshot())
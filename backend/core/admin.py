@@ -0,0 +1,8 @@
+from core.pagination import EstimatedCountPaginator
+
+
+class EstimatedCountAdminMixin:
+    """Список объектов без точного COUNT(*) по всей таблице."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
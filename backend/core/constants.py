@@ -6,6 +6,51 @@ COOKING_MIN_TIME = 1
 MAX_POSITIVE_VALUE = 32767
 URL_MAX_LENGTH = 200
 SHORT_URL_LENGTH = 6
+# Новые коды длиннее старых случайных, поэтому их множества не пересекаются.
+SHORT_CODE_LENGTH = 7
 SHORT_URL_MAX_LENGTH = 10
 DEFAULT_PAGE_SIZE = 5
-FILE_NAME = 'cart.txt'
+FILE_NAME = 'cart'
+SHOPPING_LIST_BATCH_SIZE = 1000
+SHOPPING_LIST_CHUNK_SIZE = 500
+INGREDIENT_LOAD_BATCH_SIZE = 5000
+RECIPE_EXPORT_BATCH_SIZE = 500
+BULK_RELATIONS_MAX_SIZE = 100
+# Наибольший id в столбце BigAutoField.
+MAX_ID_VALUE = 2 ** 63 - 1
+INGREDIENTS_VERSION = 'ingredients'
+TAGS_VERSION = 'tags'
+VERSION_NAME_MAX_LENGTH = 50
+# Сколько секунд процесс доверяет прочитанной из БД версии данных.
+VERSION_CHECK_INTERVAL = 1
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+ESTIMATED_COUNT_THRESHOLD = 10000
+COUNT_CACHE_TIMEOUT = 60
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+# Ширина уменьшенных копий картинок в пикселях.
+IMAGE_RENDITIONS = {'thumb': 160, 'card': 480, 'detail': 1200}
+RECIPE_IMAGE_RENDITIONS = ('thumb', 'card', 'detail')
+AVATAR_RENDITIONS = ('thumb',)
+RAW_IMAGE_PREFIX = 'raw-'
+STORAGE_SHARD_DEPTH = 2
+STORAGE_GC_GRACE_HOURS = 24
+SHORT_LINK_LOCAL_CACHE_SIZE = 10000
+SHORT_LINK_LOCAL_TIMEOUT = 60
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24
+SHORT_LINK_NEGATIVE_TIMEOUT = 30
+SHORT_LINK_HITS_FLUSH_INTERVAL = 30
+SHORT_LINK_HITS_FLUSH_SIZE = 1000
+FAVORITE_SCORE_WEIGHT = 1
+SHOPPING_CART_SCORE_WEIGHT = 2
+POPULARITY_HALF_LIFE_DAYS = 30
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_WINDOW_DAYS = 7
+# Оценки хранятся относительно общей точки отсчёта, которая сдвигается
+# раз в столько дней с полным пересчётом.
+SCORES_REBASE_DAYS = 7
+RECIPE_SCORES_BATCH_SIZE = 1000
+RECIPE_SCORES_VERSION = 'recipe-scores'
+RECIPE_ORDERINGS = {
+    'popular': ('-popularity', '-id'),
+    'trending': ('-trending', '-id'),
+}
@@ -0,0 +1,52 @@
+from django.db.models import (Case, Count, F, IntegerField, OuterRef, Subquery,
+                              Value, When)
+from django.db.models.functions import Coalesce, Greatest
+
+
+class CounterFieldsMixin:
+    """Не даёт полному save() затереть счётчики устаревшими значениями.
+
+    Поля из `counter_fields` меняются только через update() с F(), поэтому
+    при сохранении существующего объекта они исключаются из UPDATE.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно меняет счётчик, не опуская его ниже нуля."""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+def add_to_counters(model, field, deltas):
+    """Прибавляет к счётчикам нескольких объектов одним UPDATE.
+
+    `deltas` — словарь {pk: приращение}.
+    """
+    if not deltas:
+        return
+    model.objects.filter(pk__in=deltas).update(**{field: Greatest(
+        F(field) + Case(
+            *(When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()),
+            output_field=IntegerField()
+        ), 0
+    )})
+
+
+def count_subquery(model, field):
+    """Количество строк `model`, ссылающихся полем `field` на OuterRef."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total')
+    ), 0)
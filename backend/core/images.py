@@ -0,0 +1,233 @@
+import base64
+import binascii
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from core.constants import RAW_IMAGE_PREFIX
+from core.metrics import increment, timer
+from core.renditions import (RENDITIONS_REJECTED, RENDITIONS_SOURCE,
+                             RENDITIONS_UPLOAD, get_rendition_url,
+                             get_renditions_field, get_srcset, is_rejected,
+                             make_renditions)
+
+logger = logging.getLogger('foodgram.images')
+
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+JPEG_QUALITY = 85
+
+_executor = None
+
+
+def sniff_extension(data):
+    for signature, extension in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class Base64ImageField(serializers.ImageField):
+    """Картинка в base64, принимаемая без декодирования через Pillow.
+
+    Размер проверяется до декодирования, формат — по сигнатуре файла.
+    Сырые байты сохраняются как есть, а проверку, перекодирование и
+    удаление метаданных выполняет фоновый пул (см. process_image).
+    """
+
+    default_error_messages = {
+        'invalid_image': 'Загрузите корректное изображение.',
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid_image')
+        if data.startswith('data:'):
+            _, _, data = data.partition(';base64,')
+        max_size = settings.MAX_IMAGE_UPLOAD_SIZE
+        if len(data) * 3 // 4 > max_size + 2:
+            self.fail('too_large', max_size=max_size)
+        with timer('image.decode'):
+            try:
+                content = base64.b64decode(data, validate=True)
+            except (binascii.Error, ValueError):
+                self.fail('invalid_image')
+        if len(content) > max_size:
+            self.fail('too_large', max_size=max_size)
+        extension = sniff_extension(content)
+        if extension is None:
+            self.fail('invalid_image')
+        increment('image.accepted')
+        return ContentFile(
+            content, name=f'{RAW_IMAGE_PREFIX}{uuid.uuid4().hex}.{extension}'
+        )
+
+    def to_representation(self, value):
+        if is_rejected(value):
+            return None
+        return super().to_representation(value)
+
+
+class RenditionImageField(serializers.ImageField):
+    """Адрес уменьшенной копии картинки, а пока её нет — оригинала."""
+
+    def __init__(self, rendition, **kwargs):
+        self.rendition = rendition
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if is_rejected(value):
+            return None
+        url = get_rendition_url(value, self.rendition)
+        if url is None:
+            return super().to_representation(value)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class SrcsetField(serializers.Field):
+    """Строка srcset из уменьшенных копий картинки."""
+
+    def __init__(self, renditions, **kwargs):
+        self.renditions = renditions
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        return get_srcset(
+            value, self.renditions,
+            request.build_absolute_uri if request else str
+        )
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PIPELINE_WORKERS,
+            thread_name_prefix='image-pipeline'
+        )
+    return _executor
+
+
+def is_raw_image(name):
+    return bool(name) and name.rsplit('/', 1)[-1].startswith(RAW_IMAGE_PREFIX)
+
+
+def schedule_image_processing(instance, field_name, renditions=()):
+    """Ставит сырую картинку поля в очередь после фиксации транзакции."""
+    name = getattr(instance, field_name).name
+    if not is_raw_image(name) or is_rejected(getattr(instance, field_name)):
+        return
+    model, pk = type(instance), instance.pk
+    if settings.IMAGE_PIPELINE_WORKERS:
+        transaction.on_commit(lambda: get_executor().submit(
+            run_in_worker, model, pk, field_name, name, renditions))
+    else:
+        transaction.on_commit(lambda: process_image(
+            model, pk, field_name, name, renditions))
+
+
+def run_in_worker(*args):
+    close_old_connections()
+    try:
+        process_image(*args)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', args)
+    finally:
+        close_old_connections()
+
+
+def reencode(raw):
+    """Проверяет картинку и пересохраняет её без метаданных."""
+    with timer('image.verify'):
+        Image.open(BytesIO(raw)).verify()
+    with timer('image.reencode'):
+        image = ImageOps.exif_transpose(Image.open(BytesIO(raw)))
+        output = BytesIO()
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image.convert('RGBA').save(output, 'PNG', optimize=True)
+            extension = 'png'
+        else:
+            image.convert('RGB').save(output, 'JPEG', quality=JPEG_QUALITY,
+                                      optimize=True)
+            extension = 'jpg'
+    return image, output.getvalue(), extension
+
+
+def get_rejected_value(instance, field_name, raw_name):
+    """Картинка и копии, которые остаются в поле после отказа.
+
+    Возвращается прежняя проверенная картинка. Если её не было,
+    необязательное поле очищается, а в обязательном остаётся загрузка
+    с отметкой об отказе: API её не отдаёт, а process_raw_images не
+    берёт в работу.
+    """
+    renditions = getattr(instance, get_renditions_field(field_name))
+    if renditions.get(RENDITIONS_SOURCE):
+        return renditions[RENDITIONS_SOURCE], renditions
+    if instance._meta.get_field(field_name).blank:
+        return '', {}
+    return raw_name, {RENDITIONS_REJECTED: raw_name}
+
+
+def process_image(model, pk, field_name, raw_name, renditions=()):
+    """Заменяет сырую картинку в поле объекта на проверенную копию.
+
+    Сырые и заменённые файлы не удаляются: в хранилище с дедупликацией
+    на них могут ссылаться другие объекты, их убирает
+    `collect_media_garbage`. Отклонённая загрузка не стирает прежнюю
+    картинку (см. get_rejected_value).
+    """
+    field = model._meta.get_field(field_name)
+    renditions_field = get_renditions_field(field_name)
+    storage = field.storage
+    with timer('image.total'):
+        with timer('image.read'), storage.open(raw_name) as raw_file:
+            raw = raw_file.read()
+        try:
+            image, content, extension = reencode(raw)
+        except (OSError, SyntaxError, ValueError,
+                Image.DecompressionBombError):
+            increment('image.rejected')
+            logger.warning('Отклонено изображение %s', raw_name)
+            final_name = created = None
+        else:
+            with timer('image.store'):
+                final_name = storage.save(
+                    field.generate_filename(None, f'image.{extension}'),
+                    ContentFile(content)
+                )
+            created = make_renditions(image, final_name, field, renditions)
+            created[RENDITIONS_UPLOAD] = storage.get_digest(ContentFile(raw))
+        with transaction.atomic():
+            instance = model.objects.select_for_update().filter(
+                pk=pk, **{field_name: raw_name}).first()
+            # Картинку могли успеть заменить или удалить объект.
+            if instance is not None:
+                if final_name is None:
+                    final_name, created = get_rejected_value(
+                        instance, field_name, raw_name)
+                setattr(instance, field_name, final_name)
+                setattr(instance, renditions_field, created)
+                instance.save(update_fields=[field_name, renditions_field] + [
+                    field.name for field in model._meta.concrete_fields
+                    if getattr(field, 'auto_now', False)
+                ])
+    increment('image.processed')
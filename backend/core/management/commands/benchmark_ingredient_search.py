@@ -0,0 +1,66 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from recipes.models import Ingredient
+from recipes.search import limit_search_results, search_ingredients
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_QUERIES = ('мол', 'сахар', 'ово', 'перец черный')
+BATCH_SIZE = 10_000
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск ингредиентов с фильтром icontains на растущем '
+            'каталоге. Синтетические данные откатываются по завершении.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=DEFAULT_SIZES)
+        parser.add_argument('--queries', nargs='+', default=DEFAULT_QUERIES)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def measure(self, build_queryset, repeat):
+        started = perf_counter()
+        for _ in range(repeat):
+            list(build_queryset())
+        return (perf_counter() - started) / repeat * 1000
+
+    def fill_catalog(self, size):
+        names = list(Ingredient.objects.values_list('name', flat=True)[:1000])
+        count = Ingredient.objects.count()
+        while count < size:
+            batch = min(BATCH_SIZE, size - count)
+            Ingredient.objects.bulk_create(
+                Ingredient(name=f'{names[(count + i) % len(names)]} '
+                                f'{count + i}',
+                           measurement_unit='г')
+                for i in range(batch)
+            )
+            count += batch
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE recipes_ingredient')
+
+    def handle(self, *args, sizes, queries, repeat, **options):
+        if not Ingredient.objects.exists():
+            self.stdout.write(self.style.ERROR(
+                'Каталог пуст: сначала выполните load_ingredients.'
+            ))
+            return
+        with transaction.atomic():
+            for size in sorted(sizes):
+                self.fill_catalog(size)
+                for query in queries:
+                    old = self.measure(
+                        lambda: Ingredient.objects.filter(
+                            name__icontains=query), repeat)
+                    new = self.measure(
+                        lambda: limit_search_results(search_ingredients(
+                            Ingredient.objects.all(), query)), repeat)
+                    self.stdout.write(
+                        f'{size:>9} {query!r:>16}: icontains '
+                        f'{old:9.2f} мс, поиск {new:9.2f} мс'
+                    )
+            transaction.set_rollback(True)
@@ -0,0 +1,69 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.constants import STORAGE_GC_GRACE_HOURS
+from core.renditions import get_renditions_field
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Удаляет файлы картинок, на которые не ссылается ни один '
+            'рецепт или пользователь.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=int, default=STORAGE_GC_GRACE_HOURS,
+            help='Не трогать файлы моложе указанного числа часов.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.'
+        )
+
+    def handle(self, *args, grace_hours, dry_run, **options):
+        deadline = timezone.now() - timedelta(hours=grace_hours)
+        for model, field_name in ((Recipe, 'image'), (User, 'avatar')):
+            field = model._meta.get_field(field_name)
+            references = Counter(
+                model.objects.exclude(**{field_name: ''}).exclude(
+                    **{f'{field_name}__isnull': True}
+                ).values_list(field_name, flat=True).iterator()
+            )
+            referenced = set(references)
+            for created in model.objects.exclude(
+                **{get_renditions_field(field_name): {}}
+            ).values_list(get_renditions_field(field_name),
+                          flat=True).iterator():
+                referenced.update(created.values())
+            self.collect(field.storage, field.upload_to, referenced,
+                         deadline, dry_run)
+            shared = sum(1 for count in references.values() if count > 1)
+            self.stdout.write(
+                f'{field.upload_to}: ссылок {sum(references.values())}, '
+                f'файлов {len(references)}, общих {shared}.'
+            )
+
+    def collect(self, storage, path, referenced, deadline, dry_run):
+        if not storage.exists(path):
+            return
+        deleted = freed = 0
+        for name in storage.walk(path.rstrip('/')):
+            if name in referenced or storage.get_modified_time(
+                    name) > deadline:
+                continue
+            freed += storage.size(name)
+            deleted += 1
+            if dry_run:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'{path}: {"к удалению" if dry_run else "удалено"} {deleted} '
+            f'файлов, {freed} байт.'
+        ))
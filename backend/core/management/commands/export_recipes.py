@@ -0,0 +1,68 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from core.constants import RECIPE_EXPORT_BATCH_SIZE
+from recipes.models import Recipe, RecipeIngredient
+
+
+def serialize_recipe(recipe):
+    return {
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'image': recipe.image.name,
+        'author': recipe.author.email,
+        'short_url': recipe.short_url,
+        'created_at': recipe.created_at.isoformat(),
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {'name': item.ingredient.name,
+             'measurement_unit': item.ingredient.measurement_unit,
+             'amount': item.amount}
+            for item in recipe.recipe_ingredients.all()
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = ('Выгружает рецепты в JSON Lines: по одному рецепту на строку. '
+            'Файлы картинок переносятся отдельно.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='-',
+            help='Путь к файлу или «-» для вывода в stdout.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=RECIPE_EXPORT_BATCH_SIZE,
+            help='Сколько рецептов читать одним запросом.'
+        )
+
+    def handle(self, *args, output, batch_size, **options):
+        stream = (sys.stdout if output == '-'
+                  else open(output, 'w', encoding='utf-8'))
+        queryset = Recipe.objects.select_related('author').prefetch_related(
+            'tags',
+            Prefetch('recipe_ingredients',
+                     RecipeIngredient.objects.select_related('ingredient'))
+        ).order_by('pk')
+        exported, last_pk = 0, 0
+        try:
+            while True:
+                # Постраничный обход по pk без OFFSET: память постоянна.
+                batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                for recipe in batch:
+                    stream.write(json.dumps(
+                        serialize_recipe(recipe), ensure_ascii=False) + '\n')
+                exported += len(batch)
+                last_pk = batch[-1].pk
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено рецептов: {exported}.'))
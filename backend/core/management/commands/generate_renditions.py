@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+
+from core.constants import AVATAR_RENDITIONS, RECIPE_IMAGE_RENDITIONS
+from core.images import is_raw_image
+from core.renditions import (RENDITIONS_SOURCE, get_renditions_field,
+                             make_renditions)
+from recipes.models import Recipe
+from recipes.service import touch_recipes
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии уже загруженных картинок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать копии, даже если они уже есть.'
+        )
+
+    def handle(self, *args, force=False, **options):
+        recipe_ids = self.generate(
+            Recipe, 'image', RECIPE_IMAGE_RENDITIONS, force)
+        # Адреса копий попадают в закешированные карточки рецептов.
+        for start in range(0, len(recipe_ids), 1000):
+            touch_recipes(
+                Recipe.objects.filter(pk__in=recipe_ids[start:start + 1000]))
+        self.generate(User, 'avatar', AVATAR_RENDITIONS, force)
+
+    def generate(self, model, field_name, renditions, force):
+        field = model._meta.get_field(field_name)
+        renditions_field = get_renditions_field(field_name)
+        done, failed = [], 0
+        rows = model.objects.exclude(**{field_name: ''}).values_list(
+            'pk', field_name, renditions_field)
+        for pk, name, created in rows.iterator():
+            if is_raw_image(name):
+                continue
+            if created.get(RENDITIONS_SOURCE) != name:
+                created = {}
+            if not force and all(
+                rendition in created for rendition in renditions
+            ):
+                continue
+            try:
+                with field.storage.open(name) as image_file:
+                    image = ImageOps.exif_transpose(Image.open(image_file))
+                    created = {**created, **make_renditions(
+                        image, name, field, renditions)}
+            except (OSError, SyntaxError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+                continue
+            # Картинку могли заменить, пока создавались копии.
+            model.objects.filter(pk=pk, **{field_name: name}).update(
+                **{renditions_field: created})
+            done.append(pk)
+        self.stdout.write(self.style.SUCCESS(
+            f'{model._meta.verbose_name_plural}: обработано {len(done)}, '
+            f'ошибок {failed}.'
+        ))
+        return done
@@ -0,0 +1,152 @@
+import json
+import sys
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, Max, Value, When
+from django.utils.dateparse import parse_datetime
+
+from core.constants import RECIPE_EXPORT_BATCH_SIZE
+from core.counters import add_to_counters
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Загружает рецепты из JSON Lines, выгруженных export_recipes. '
+            'Авторы, теги и ингредиенты должны уже существовать.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Путь к файлу или «-» для чтения из stdin.')
+        parser.add_argument(
+            '--batch-size', type=int, default=RECIPE_EXPORT_BATCH_SIZE,
+            help='Сколько рецептов записывать за одну транзакцию.'
+        )
+
+    def handle(self, *args, path, batch_size, **options):
+        try:
+            stream = (sys.stdin if path == '-'
+                      else open(path, 'r', encoding='utf-8'))
+        except FileNotFoundError:
+            raise CommandError(f'Файл не найден: {path}')
+        self.authors = dict(User.objects.values_list('email', 'id'))
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.ingredients = {
+            (name, unit): pk for pk, name, unit in
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        }
+        self.skipped = imported = 0
+        try:
+            for records in self.read_batches(stream, batch_size):
+                if records:
+                    with transaction.atomic():
+                        self.create(records)
+                    imported += len(records)
+                    self.stdout.write(f'Загружено рецептов: {imported}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено рецептов: {imported}, пропущено: {self.skipped}.'))
+
+    def read_batches(self, stream, batch_size):
+        lines = enumerate(stream, 1)
+        while True:
+            chunk = list(islice(lines, batch_size))
+            if not chunk:
+                return
+            records = []
+            for number, line in chunk:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(self.resolve(json.loads(line)))
+                except (KeyError, TypeError, ValueError) as error:
+                    self.skipped += 1
+                    self.stderr.write(f'Строка {number}: {error!r}')
+            yield records
+
+    def resolve(self, data):
+        """Рецепт и id связанных объектов по данным одной строки."""
+        ingredients = {}
+        for item in data['ingredients']:
+            key = (item['name'], item['measurement_unit'])
+            amount = int(item['amount'])
+            if amount < 1:
+                raise ValueError(f'Неверное количество: {key}')
+            ingredients[self.ingredients[key]] = amount
+        recipe = Recipe(
+            author_id=self.authors[data['author']],
+            name=data['name'],
+            text=data['text'],
+            cooking_time=int(data['cooking_time']),
+            image=data['image'],
+            short_url=data.get('short_url') or None,
+        )
+        created_at = data.get('created_at')
+        return {
+            'recipe': recipe,
+            'created_at': created_at and parse_datetime(created_at),
+            'tag_ids': {self.tags[slug] for slug in data['tags']},
+            'ingredients': ingredients,
+        }
+
+    @staticmethod
+    def keep_short_urls(recipes):
+        """Сохраняет свободные старые коды; остальным хватит кода по id."""
+        requested = [recipe.short_url for recipe in recipes
+                     if recipe.short_url]
+        taken = set(Recipe.objects.filter(
+            short_url__in=requested).values_list('short_url', flat=True))
+        for recipe in recipes:
+            if recipe.short_url in taken:
+                recipe.short_url = None
+            elif recipe.short_url:
+                taken.add(recipe.short_url)
+
+    @staticmethod
+    def lock_for_write(model):
+        quote = connection.ops.quote_name
+        pk = quote(model._meta.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {quote(model._meta.db_table)} '
+                           f'SET {pk} = {pk} WHERE 1 = 0')
+
+    def create(self, records):
+        recipes = [record['recipe'] for record in records]
+        self.keep_short_urls(recipes)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # Без RETURNING (SQLite) id назначаем сами. Транзакция SQLite
+            # начинается без блокировки, и SELECT её не берёт: пустой
+            # UPDATE захватывает блокировку записи до чтения Max(pk),
+            # чтобы другой процесс не вставил рецепты с теми же id.
+            self.lock_for_write(Recipe)
+            last_pk = Recipe.objects.aggregate(last=Max('pk'))['last'] or 0
+            for pk, recipe in enumerate(recipes, last_pk + 1):
+                recipe.pk = pk
+        Recipe.objects.bulk_create(recipes)
+        dates = [When(pk=record['recipe'].pk, then=Value(record['created_at']))
+                 for record in records if record['created_at']]
+        if dates:
+            Recipe.objects.filter(pk__in=[
+                record['recipe'].pk for record in records
+            ]).update(created_at=Case(*dates, default='created_at',
+                                      output_field=DateTimeField()))
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=record['recipe'].pk, tag_id=tag_id)
+            for record in records for tag_id in record['tag_ids']
+        ])
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe_id=record['recipe'].pk,
+                             ingredient_id=ingredient_id, amount=amount)
+            for record in records
+            for ingredient_id, amount in record['ingredients'].items()
+        ])
+        # bulk_create не вызывает сигналов, которые ведут счётчики.
+        add_to_counters(User, 'recipes_count',
+                        Counter(recipe.author_id for recipe in recipes))
@@ -1,26 +1,205 @@
 import csv
+import io
+import json
 import os
+import sys
+from itertools import islice
+from time import perf_counter
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
-from recipes.models import Ingredient
+from core.constants import (INGREDIENT_LOAD_BATCH_SIZE, INGREDIENT_MAX_LENGTH,
+                            INGREDIENTS_VERSION)
+from core.versions import bump_version
+from recipes.models import Ingredient, Recipe
+from recipes.service import touch_recipes
+
+JSON_READ_SIZE = 64 * 1024
+STAGING_TABLE = 'ingredient_staging'
+
+
+def iter_csv(stream):
+    for row in csv.reader(stream):
+        if row:
+            yield row[0], row[1] if len(row) > 1 else ''
+
+
+def iter_json(stream):
+    """Объекты из JSON-массива или JSON Lines без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n[,]':
+            position += 1
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[position:].strip():
+                    raise
+                return
+            chunk = stream.read(JSON_READ_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item['name'], item.get('measurement_unit', '')
+
+
+def touch_ingredient_recipes(ingredient_ids):
+    # Массовое обновление не вызывает сигналов, а единица измерения
+    # входит в закешированные карточки рецептов.
+    if ingredient_ids:
+        touch_recipes(Recipe.objects.filter(
+            ingredients__in=ingredient_ids).distinct())
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
 
 
 class Command(BaseCommand):
-    def handle(self, *args, **options):
-        file_path = os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
+    help = ('Загружает ингредиенты из CSV или JSON. Повторная загрузка '
+            'не создаёт дубликатов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv'),
+            help='Путь к файлу или «-» для чтения из stdin.'
+        )
+        parser.add_argument(
+            '--format', choices=('csv', 'json'), dest='data_format',
+            help='Формат данных; по умолчанию определяется по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=INGREDIENT_LOAD_BATCH_SIZE,
+            help='Сколько строк записывать за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--update-units', action='store_true',
+            help='Исправлять единицу измерения у ингредиента с тем же '
+                 'названием вместо добавления новой пары.'
+        )
+
+    def handle(self, *args, path, data_format, batch_size, update_units,
+               **options):
+        if data_format is None:
+            data_format = ('json' if path.endswith(('.json', '.jsonl'))
+                           else 'csv')
+        try:
+            stream = (sys.stdin if path == '-'
+                      else open(path, 'r', encoding='utf-8', newline=''))
+        except FileNotFoundError:
+            raise CommandError(f'Файл не найден: {path}')
+        rows = (iter_json if data_format == 'json' else iter_csv)(stream)
+        write = (self.write_postgresql if connection.vendor == 'postgresql'
+                 else self.write_generic)
+        before = Ingredient.objects.count()
+        total = skipped = 0
+        started = perf_counter()
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                Ingredient.objects.bulk_create(
-                    (Ingredient(name=name, measurement_unit=unit)
-                     for name, unit in csv.reader(f)),
-                    ignore_conflicts=True
+            if connection.vendor == 'postgresql':
+                self.create_staging_table()
+            for batch in batches(rows, batch_size):
+                clean = self.clean(batch)
+                skipped += len(batch) - len(clean)
+                with transaction.atomic():
+                    write(clean, update_units)
+                total += len(batch)
+                elapsed = perf_counter() - started
+                self.stdout.write(
+                    f'{total} строк, {total / elapsed:.0f} строк/с'
                 )
-            self.stdout.write(
-                self.style.SUCCESS('Successfully added ingredients!')
+        except (csv.Error, json.JSONDecodeError, KeyError, TypeError) as e:
+            raise CommandError(f'Ошибка чтения данных: {e!r}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        bump_version(INGREDIENTS_VERSION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано {total} строк за {perf_counter() - started:.1f} с, '
+            f'добавлено {Ingredient.objects.count() - before}, '
+            f'пропущено {skipped}.'
+        ))
+
+    @staticmethod
+    def clean(batch):
+        rows = {}
+        for name, unit in batch:
+            name, unit = str(name).strip(), str(unit).strip()
+            if (name and len(name) <= INGREDIENT_MAX_LENGTH
+                    and len(unit) <= INGREDIENT_MAX_LENGTH):
+                rows[name, unit] = None
+        return list(rows)
+
+    @staticmethod
+    def create_staging_table():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} '
+                '(name text, measurement_unit text) ON COMMIT DELETE ROWS'
             )
-        except FileNotFoundError:
-            self.stdout.write(self.style.ERROR(f'File not found: {file_path}'))
-        except csv.Error as e:
-            self.stdout.write(self.style.ERROR(f'Error reading CSV file: {e}'))
+
+    @staticmethod
+    def write_postgresql(rows, update_units):
+        """COPY во временную таблицу и перенос строк одним запросом."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {STAGING_TABLE} (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)', buffer
+            )
+            if update_units:
+                cursor.execute(
+                    f'UPDATE {table} AS i '
+                    'SET measurement_unit = s.measurement_unit '
+                    f'FROM {STAGING_TABLE} AS s '
+                    'WHERE i.name = s.name '
+                    'AND i.measurement_unit <> s.measurement_unit '
+                    f'AND NOT EXISTS (SELECT 1 FROM {table} AS o '
+                    'WHERE o.name = i.name AND o.id <> i.id) '
+                    f'AND NOT EXISTS (SELECT 1 FROM {table} AS d '
+                    'WHERE d.name = s.name '
+                    'AND d.measurement_unit = s.measurement_unit) '
+                    'RETURNING i.id'
+                )
+                touch_ingredient_recipes([row[0] for row in cursor])
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                f'SELECT name, measurement_unit FROM {STAGING_TABLE} '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+
+    @staticmethod
+    def write_generic(rows, update_units):
+        if update_units:
+            units = dict(rows)
+            existing = {}
+            for ingredient in Ingredient.objects.filter(name__in=units):
+                existing.setdefault(ingredient.name, []).append(ingredient)
+            # Единицу меняем, только если название встречается один раз.
+            changed = [
+                ingredients[0] for name, ingredients in existing.items()
+                if len(ingredients) == 1
+                and ingredients[0].measurement_unit != units[name]
+            ]
+            for ingredient in changed:
+                ingredient.measurement_unit = units[ingredient.name]
+            Ingredient.objects.bulk_update(changed, ('measurement_unit',))
+            touch_ingredient_recipes([ingredient.id for ingredient in changed])
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=unit)
+             for name, unit in rows),
+            ignore_conflicts=True
+        )
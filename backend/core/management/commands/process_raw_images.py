@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.constants import (AVATAR_RENDITIONS, RAW_IMAGE_PREFIX,
+                            RECIPE_IMAGE_RENDITIONS)
+from core.images import is_raw_image, process_image
+from core.renditions import RENDITIONS_REJECTED, get_renditions_field
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Обрабатывает сырые загрузки, оставшиеся в полях после '
+            'остановки фонового пула. Запускается после каждого деплоя.')
+
+    def handle(self, *args, **options):
+        self.process(Recipe, 'image', RECIPE_IMAGE_RENDITIONS)
+        self.process(User, 'avatar', AVATAR_RENDITIONS)
+
+    def process(self, model, field_name, renditions):
+        rows = model.objects.filter(**{
+            f'{field_name}__contains': f'/{RAW_IMAGE_PREFIX}'
+        }).values_list('pk', field_name, get_renditions_field(field_name))
+        done = 0
+        for pk, name, created in rows.iterator():
+            if (not is_raw_image(name)
+                    or created.get(RENDITIONS_REJECTED) == name):
+                continue
+            # Повтор безопасен: process_image меняет поле, только если в нём
+            # всё ещё эта загрузка.
+            process_image(model, pk, field_name, name, renditions)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'{model._meta.verbose_name_plural}: обработано {done}.'))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import ShoppingListItem
+from recipes.service import get_shopping_list_totals, refresh_shopping_list
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает и проверяет агрегаты списков покупок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя; можно указать несколько раз.'
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить агрегаты, не пересчитывая их.'
+        )
+
+    def handle(self, *args, user_ids=None, check=False, **options):
+        if not check:
+            refresh_shopping_list(user_ids)
+        expected = {
+            (total['user_id'], total['ingredient_id']): total['total_amount']
+            for total in get_shopping_list_totals(user_ids).iterator()
+        }
+        items = ShoppingListItem.objects.all()
+        if user_ids is not None:
+            items = items.filter(user_id__in=user_ids)
+        actual = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount in items.values_list(
+                'user_id', 'ingredient_id', 'total_amount').iterator()
+        }
+        mismatches = [
+            key for key in expected.keys() | actual.keys()
+            if expected.get(key) != actual.get(key)
+        ]
+        for user_id, ingredient_id in mismatches:
+            self.stdout.write(self.style.WARNING(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'ожидается {expected.get((user_id, ingredient_id))}, '
+                f'в таблице {actual.get((user_id, ingredient_id))}'
+            ))
+        if mismatches:
+            self.stdout.write(self.style.ERROR(
+                f'Расхождений: {len(mismatches)}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Списки покупок согласованы ({len(actual)} позиций).'
+            ))
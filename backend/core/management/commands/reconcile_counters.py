@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from core.counters import count_subquery
+from recipes.models import Favorite, Recipe
+from users.models import Subscribe
+
+User = get_user_model()
+
+RECONCILE_BATCH_SIZE = 1000
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscribe, 'author'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики с фактическим числом связанных строк.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только показать расхождения, не исправляя их.'
+        )
+
+    def handle(self, *args, check=False, **options):
+        for model, field, related_model, related_field in COUNTERS:
+            actual = count_subquery(related_model, related_field)
+            mismatched = list(model.objects.annotate(actual=actual).exclude(
+                **{field: F('actual')}).values_list('pk', flat=True))
+            if not check:
+                for start in range(0, len(mismatched), RECONCILE_BATCH_SIZE):
+                    model.objects.filter(pk__in=mismatched[
+                        start:start + RECONCILE_BATCH_SIZE
+                    ]).update(**{field: actual})
+            label = f'{model.__name__}.{field}'
+            if not mismatched:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{label}: расхождений нет.'))
+            elif check:
+                self.stdout.write(self.style.WARNING(
+                    f'{label}: расхождений {len(mismatched)}.'))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{label}: исправлено {len(mismatched)}.'))
@@ -0,0 +1,25 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from recipes.service import refresh_recipe_scores
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает популярность и тренд рецептов для сортировок '
+            'ordering=popular и ordering=trending. Запускается по '
+            'расписанию, например раз в 10 минут из cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать оценки всех рецептов, а не только изменённых.'
+        )
+
+    def handle(self, *args, full=False, **options):
+        started = perf_counter()
+        updated = refresh_recipe_scores(full=full)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено оценок: {updated} за '
+            f'{perf_counter() - started:.1f} с.'
+        ))
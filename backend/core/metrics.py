@@ -0,0 +1,47 @@
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+logger = logging.getLogger('foodgram.metrics')
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0})
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def record_timing(name, seconds):
+    with _lock:
+        timing = _timings[name]
+        timing['count'] += 1
+        timing['total'] += seconds
+        timing['max'] = max(timing['max'], seconds)
+    logger.debug('%s: %.1f мс', name, seconds * 1000)
+
+
+@contextmanager
+def timer(name):
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, perf_counter() - started)
+
+
+def snapshot():
+    """Счётчики и тайминги текущего процесса."""
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'timings': {
+                name: {**timing,
+                       'avg': timing['total'] / timing['count']}
+                for name, timing in _timings.items()
+            },
+        }
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.constants import VERSION_NAME_MAX_LENGTH
+
 User = get_user_model()
 
 
@@ -16,6 +18,7 @@ class UserRecipeModel(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Рецепт'
     )
+    created_at = models.DateTimeField('Дата добавления', auto_now_add=True)
 
     class Meta:
         abstract = True
@@ -28,3 +31,18 @@ class UserRecipeModel(models.Model):
 
     def __str__(self):
         return f'{self._meta.verbose_name} - {self.recipe.name}'
+
+
+class DataVersion(models.Model):
+    """Время последнего изменения набора данных, общее для всех процессов."""
+
+    name = models.CharField('Набор данных', max_length=VERSION_NAME_MAX_LENGTH,
+                            primary_key=True)
+    updated_at = models.DateTimeField('Время изменения')
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return self.name
@@ -1,8 +1,173 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from datetime import date, datetime
+from hashlib import md5
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.constants import (COUNT_CACHE_TIMEOUT, DEFAULT_PAGE_SIZE,
+                            ESTIMATED_COUNT_THRESHOLD)
+
+
+def estimate_count(queryset):
+    """Количество строк без точного COUNT(*) на больших выборках.
+
+    Для таблицы без фильтров на PostgreSQL берётся оценка планировщика
+    из pg_class.reltuples. Иначе точный результат COUNT(*), который для
+    больших выборок кешируется на COUNT_CACHE_TIMEOUT секунд.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                (queryset.model._meta.db_table,)
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+            return int(row[0])
+    key = 'count:{}'.format(md5(str(queryset.query).encode()).hexdigest())
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        if count >= ESTIMATED_COUNT_THRESHOLD:
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+
+def get_ordering(queryset):
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return tuple(
+        field.replace('pk', queryset.model._meta.pk.name, 1)
+        for field in ordering
+    )
+
+
+def serialize_value(value):
+    # В отличие от DjangoJSONEncoder сохраняет микросекунды.
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'Unsupported cursor value: {value!r}')
+
 
-from core.constants import DEFAULT_PAGE_SIZE
+def get_value(row, field):
+    return row[field] if isinstance(row, dict) else getattr(row, field)
+
+
+def keyset_filter(ordering, values):
+    """Условие «строго после `values`» для сортировки `ordering`."""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
 
 
 class FoodgramPaginator(PageNumberPagination):
     page_size = DEFAULT_PAGE_SIZE
     page_size_query_param = 'limit'
+
+
+class FoodgramCursorPaginator(FoodgramPaginator):
+    """Курсорная пагинация по полям сортировки выборки.
+
+    Совместима с `page`/`limit`: ответ имеет тот же вид, а ссылка `next`
+    содержит и номер страницы, и курсор. Переход по ней выбирает строки
+    после последней показанной без OFFSET, поэтому глубина страницы не
+    влияет на время ответа. Последнее поле сортировки должно быть
+    уникальным (обычно id).
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        self.ordering = get_ordering(queryset)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            rows = super().paginate_queryset(queryset, request, view)
+            self.page_number = self.page.number
+            self.count = self.page.paginator.count
+            has_next = self.page.has_next()
+        else:
+            self.page_number, values = self.decode_cursor(cursor)
+            rows = list(queryset.filter(
+                keyset_filter(self.ordering, values))[:page_size + 1])
+            has_next = len(rows) > page_size
+            rows = rows[:page_size]
+            self.count = estimate_count(queryset)
+        self.next_cursor = (
+            self.encode_cursor(self.page_number + 1, rows[-1])
+            if has_next and rows else None
+        )
+        return rows
+
+    def encode_cursor(self, page_number, row):
+        values = [get_value(row, field.lstrip('-'))
+                  for field in self.ordering]
+        return urlsafe_b64encode(json.dumps(
+            [page_number, values], default=serialize_value
+        ).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            page_number, values = json.loads(urlsafe_b64decode(
+                cursor.encode()))
+            page_number = int(page_number)
+            if len(values) != len(self.ordering):
+                raise ValueError
+        except (BinasciiError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return page_number, values
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = replace_query_param(
+            self.request.build_absolute_uri(), self.page_query_param,
+            self.page_number + 1
+        )
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.next_cursor)
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(),
+                                 self.cursor_query_param)
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param,
+                                   self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict((
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        )))
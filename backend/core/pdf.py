@@ -0,0 +1,266 @@
+import struct
+import zlib
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+PAGE_MARGIN = 50
+FONT_SIZE = 11
+LINE_HEIGHT = 16
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * PAGE_MARGIN) // LINE_HEIGHT
+TO_UNICODE_BLOCK_SIZE = 100
+
+# Номера объектов, которые известны заранее; страницы нумеруются дальше.
+CATALOG_ID, PAGES_ID, FONT_ID, CID_FONT_ID = 1, 2, 3, 4
+DESCRIPTOR_ID, TO_UNICODE_ID, FONT_FILE_ID = 5, 6, 7
+
+
+class TrueTypeFont:
+    """Минимальный разбор TrueType-шрифта для встраивания в PDF."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as font_file:
+            self.data = font_file.read()
+        num_tables, = struct.unpack_from('>H', self.data, 4)
+        self.tables = {}
+        for index in range(num_tables):
+            tag, _, offset, _ = struct.unpack_from(
+                '>4sLLL', self.data, 12 + 16 * index)
+            self.tables[tag.decode('latin-1')] = offset
+        head = self.tables['head']
+        self.units_per_em, = struct.unpack_from('>H', self.data, head + 18)
+        self.bbox = [self.scale(value) for value in
+                     struct.unpack_from('>4h', self.data, head + 36)]
+        hhea = self.tables['hhea']
+        ascent, descent = struct.unpack_from('>hh', self.data, hhea + 4)
+        self.ascent, self.descent = self.scale(ascent), self.scale(descent)
+        self.widths = self._read_widths()
+        self.glyphs = self._read_cmap()
+
+    def scale(self, value):
+        return value * 1000 // self.units_per_em
+
+    def _read_widths(self):
+        metrics_count, = struct.unpack_from(
+            '>H', self.data, self.tables['hhea'] + 34)
+        hmtx = self.tables['hmtx']
+        return [
+            self.scale(struct.unpack_from('>H', self.data, hmtx + 4 * i)[0])
+            for i in range(metrics_count)
+        ]
+
+    def _read_cmap(self):
+        cmap = self.tables['cmap']
+        _, count = struct.unpack_from('>HH', self.data, cmap)
+        subtables = {}
+        for index in range(count):
+            platform, encoding, offset = struct.unpack_from(
+                '>HHL', self.data, cmap + 4 + 8 * index)
+            subtables[platform, encoding] = cmap + offset
+        for key, reader in (((3, 10), self._read_format_12),
+                            ((3, 1), self._read_format_4),
+                            ((0, 3), self._read_format_4)):
+            if key in subtables:
+                return reader(subtables[key])
+        raise ImproperlyConfigured('Шрифт не содержит таблицы Unicode.')
+
+    def _read_format_4(self, offset):
+        segments, = struct.unpack_from('>H', self.data, offset + 6)
+        segments //= 2
+        ends = offset + 14
+        starts = ends + 2 * segments + 2
+        deltas = starts + 2 * segments
+        range_offsets = deltas + 2 * segments
+        glyphs = {}
+        for i in range(segments):
+            end, = struct.unpack_from('>H', self.data, ends + 2 * i)
+            start, = struct.unpack_from('>H', self.data, starts + 2 * i)
+            delta, = struct.unpack_from('>H', self.data, deltas + 2 * i)
+            range_offset_at = range_offsets + 2 * i
+            range_offset, = struct.unpack_from('>H', self.data,
+                                               range_offset_at)
+            for char in range(start, min(end, 0xFFFE) + 1):
+                if range_offset:
+                    glyph, = struct.unpack_from(
+                        '>H', self.data,
+                        range_offset_at + range_offset + 2 * (char - start))
+                    if glyph:
+                        glyph = (glyph + delta) & 0xFFFF
+                else:
+                    glyph = (char + delta) & 0xFFFF
+                if glyph:
+                    glyphs[char] = glyph
+        return glyphs
+
+    def _read_format_12(self, offset):
+        groups, = struct.unpack_from('>L', self.data, offset + 12)
+        glyphs = {}
+        for i in range(groups):
+            start, end, glyph = struct.unpack_from(
+                '>LLL', self.data, offset + 16 + 12 * i)
+            for char in range(start, end + 1):
+                glyphs[char] = glyph + char - start
+        return glyphs
+
+    def width(self, glyph):
+        return self.widths[min(glyph, len(self.widths) - 1)]
+
+
+@lru_cache(maxsize=None)
+def load_font(path):
+    try:
+        return TrueTypeFont(path)
+    except OSError as error:
+        raise ImproperlyConfigured(
+            f'Не удалось загрузить шрифт для PDF: {error}'
+        ) from error
+
+
+class StreamingPdfWriter:
+    """Пишет PDF по мере генерации страниц, запоминая смещения объектов."""
+
+    def __init__(self, font):
+        self.font = font
+        self.offset = 0
+        self.offsets = {}
+        self.used_glyphs = {}
+        self.page_ids = []
+        self.next_id = FONT_FILE_ID + 1
+
+    def _chunk(self, data):
+        self.offset += len(data)
+        return data
+
+    def header(self):
+        return self._chunk(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def object(self, object_id, body):
+        self.offsets[object_id] = self.offset
+        return self._chunk(
+            b'%d 0 obj\n%s\nendobj\n' % (object_id, body)
+        )
+
+    def stream(self, object_id, data, extra=b''):
+        data = zlib.compress(data)
+        return self.object(
+            object_id,
+            b'<< /Length %d /Filter /FlateDecode%s >>\nstream\n%s\n'
+            b'endstream' % (len(data), extra, data)
+        )
+
+    def encode(self, text):
+        glyphs = []
+        for char in text:
+            glyph = self.font.glyphs.get(ord(char), 0)
+            if glyph:
+                self.used_glyphs.setdefault(glyph, char)
+            glyphs.append(b'%04X' % glyph)
+        return b'<' + b''.join(glyphs) + b'>'
+
+    def page(self, lines):
+        """Объекты одной страницы с переданными строками текста."""
+        content = b'BT /F1 %d Tf %d TL %d %d Td\n' % (
+            FONT_SIZE, LINE_HEIGHT, PAGE_MARGIN,
+            PAGE_HEIGHT - PAGE_MARGIN - FONT_SIZE)
+        content += b''.join(
+            self.encode(line) + b' Tj T*\n' for line in lines
+        ) + b'ET'
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        return self.stream(content_id, content) + self.object(
+            page_id,
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>'
+            % (PAGES_ID, PAGE_WIDTH, PAGE_HEIGHT, FONT_ID, content_id)
+        )
+
+    def _to_unicode(self):
+        glyphs = sorted(self.used_glyphs.items())
+        blocks = []
+        for start in range(0, len(glyphs), TO_UNICODE_BLOCK_SIZE):
+            block = glyphs[start:start + TO_UNICODE_BLOCK_SIZE]
+            blocks.append(b'%d beginbfchar\n%s\nendbfchar' % (
+                len(block),
+                b'\n'.join(b'<%04X> <%s>' % (
+                    glyph, char.encode('utf-16-be').hex().upper().encode())
+                    for glyph, char in block)
+            ))
+        return (
+            b'/CIDInit /ProcSet findresource begin\n12 dict begin\n'
+            b'begincmap\n/CIDSystemInfo << /Registry (Adobe) '
+            b'/Ordering (UCS) /Supplement 0 >> def\n'
+            b'/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n'
+            b'1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n'
+            + b'\n'.join(blocks)
+            + b'\nendcmap\nCMapName currentdict /CMap defineresource pop\n'
+            b'end\nend'
+        )
+
+    def footer(self):
+        """Шрифт, дерево страниц, таблица xref и трейлер."""
+        font = self.font
+        widths = b' '.join(
+            b'%d [%d]' % (glyph, font.width(glyph))
+            for glyph in sorted(self.used_glyphs)
+        )
+        yield self.object(CATALOG_ID, b'<< /Type /Catalog /Pages %d 0 R >>'
+                          % PAGES_ID)
+        yield self.object(PAGES_ID, b'<< /Type /Pages /Kids [%s] /Count %d >>'
+                          % (b' '.join(b'%d 0 R' % page_id
+                                       for page_id in self.page_ids),
+                             len(self.page_ids)))
+        yield self.object(
+            FONT_ID,
+            b'<< /Type /Font /Subtype /Type0 /BaseFont /EmbeddedFont '
+            b'/Encoding /Identity-H /DescendantFonts [%d 0 R] '
+            b'/ToUnicode %d 0 R >>' % (CID_FONT_ID, TO_UNICODE_ID)
+        )
+        yield self.object(
+            CID_FONT_ID,
+            b'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /EmbeddedFont '
+            b'/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) '
+            b'/Supplement 0 >> /FontDescriptor %d 0 R /CIDToGIDMap /Identity '
+            b'/W [%s] >>' % (DESCRIPTOR_ID, widths)
+        )
+        yield self.object(
+            DESCRIPTOR_ID,
+            b'<< /Type /FontDescriptor /FontName /EmbeddedFont /Flags 32 '
+            b'/FontBBox [%d %d %d %d] /ItalicAngle 0 /Ascent %d /Descent %d '
+            b'/CapHeight %d /StemV 80 /FontFile2 %d 0 R >>'
+            % (*font.bbox, font.ascent, font.descent, font.ascent,
+               FONT_FILE_ID)
+        )
+        yield self.stream(TO_UNICODE_ID, self._to_unicode())
+        yield self.stream(FONT_FILE_ID, font.data,
+                          b' /Length1 %d' % len(font.data))
+        xref_offset = self.offset
+        yield b'xref\n0 %d\n0000000000 65535 f \n%s' % (
+            self.next_id,
+            b''.join(b'%010d 00000 n \n' % self.offsets[object_id]
+                     for object_id in range(1, self.next_id))
+        )
+        yield (b'trailer\n<< /Size %d /Root %d 0 R >>\n'
+               b'startxref\n%d\n%%%%EOF\n'
+               % (self.next_id, CATALOG_ID, xref_offset))
+
+
+def iter_pdf(lines, font_path):
+    """Отдаёт PDF частями: по одной странице на каждые LINES_PER_PAGE строк."""
+    writer = StreamingPdfWriter(load_font(font_path))
+    return _generate_pdf(writer, lines)
+
+
+def _generate_pdf(writer, lines):
+    yield writer.header()
+    page = []
+    for line in lines:
+        page.append(line)
+        if len(page) == LINES_PER_PAGE:
+            yield writer.page(page)
+            page = []
+    if page or not writer.page_ids:
+        yield writer.page(page)
+    yield from writer.footer()
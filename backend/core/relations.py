@@ -0,0 +1,151 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.dispatch import Signal
+
+# Как m2m_changed: один сигнал на все связи, созданные или удалённые
+# вызовом add_relations/delete_relations, с action 'post_add' или
+# 'post_remove' и списком instances. post_save и post_delete для этих
+# строк не отправляются.
+relations_changed = Signal()
+
+
+def can_return_rows():
+    # SQLite умеет RETURNING с 3.35, но Django 3.2 об этом не знает.
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return connection.features.can_return_columns_from_insert
+
+
+def get_batches(ids):
+    """Все id одним запросом, а без RETURNING — по одному.
+
+    Без RETURNING результат запроса виден только по числу строк.
+    """
+    return [ids] if can_return_rows() else [[pk] for pk in ids]
+
+
+def placeholders(count):
+    return ', '.join(['%s'] * count)
+
+
+def prepare_ids(field, ids):
+    """id из запроса без повторов и в исходном порядке."""
+    return list(dict.fromkeys(field.target_field.to_python(pk) for pk in ids))
+
+
+def get_counter_deltas(instances, attname, action):
+    """Приращения счётчиков {id: ±число связей} для add_to_counters."""
+    sign = 1 if action == 'post_add' else -1
+    return {pk: sign * count for pk, count in Counter(
+        getattr(instance, attname) for instance in instances).items()}
+
+
+def add_relations(model, target, target_ids, **values):
+    """Создаёт связи с объектами target_ids через INSERT ... ON CONFLICT.
+
+    Строки вставляются только для существующих объектов, на которые
+    ссылается поле target, и только если такой связи ещё нет.
+    Возвращает созданные экземпляры и отправляет для них один
+    relations_changed.
+    """
+    link = model._meta.get_field(target)
+    target_ids = prepare_ids(link, target_ids)
+    if not target_ids:
+        return []
+    template = model(**values)
+    fields = [field for field in model._meta.concrete_fields
+              if not field.primary_key and field is not link]
+    params = [
+        field.get_db_prep_save(field.pre_save(template, add=True), connection)
+        for field in fields
+    ]
+    quote = connection.ops.quote_name
+    related = link.related_model._meta
+    related_pk = quote(related.pk.column)
+    columns = [quote(field.column) for field in fields] + [quote(link.column)]
+    returning = (f' RETURNING {quote(model._meta.pk.column)}, '
+                 f'{quote(link.column)}' if can_return_rows() else '')
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for batch in get_batches(target_ids):
+            cursor.execute(
+                f'INSERT INTO {quote(model._meta.db_table)} '
+                f'({", ".join(columns)}) '
+                f'SELECT {"%s, " * len(fields)}{related_pk} '
+                f'FROM {quote(related.db_table)} '
+                f'WHERE {related_pk} IN ({placeholders(len(batch))}) '
+                f'ON CONFLICT DO NOTHING{returning}',
+                params + batch
+            )
+            if returning:
+                created.extend(cursor.fetchall())
+            elif cursor.rowcount == 1:
+                created.append((cursor.lastrowid, batch[0]))
+        instances = []
+        for pk, target_id in created:
+            instance = model(pk=pk, **{link.attname: target_id}, **{
+                field.attname: getattr(template, field.attname)
+                for field in fields
+            })
+            instance._state.adding = False
+            instances.append(instance)
+        if instances:
+            relations_changed.send(sender=model, action='post_add',
+                                   instances=instances,
+                                   using=connection.alias)
+    return instances
+
+
+def add_relation(model, target, target_id, **values):
+    """Одна связь из add_relations или None, если она не создана."""
+    created = add_relations(model, target, (target_id,), **values)
+    return created[0] if created else None
+
+
+def delete_relations(model, target, target_ids, **values):
+    """Удаляет связи с объектами target_ids через DELETE без выборки.
+
+    В relations_changed передаются экземпляры только с полями из values
+    и target. Возвращает id объектов, связи с которыми были удалены.
+    """
+    link = model._meta.get_field(target)
+    target_ids = prepare_ids(link, target_ids)
+    if not target_ids:
+        return []
+    template = model(**values)
+    fields = [model._meta.get_field(name) for name in values]
+    params = [field.get_db_prep_value(getattr(template, field.attname),
+                                      connection)
+              for field in fields]
+    quote = connection.ops.quote_name
+    returning = (f' RETURNING {quote(link.column)}' if can_return_rows()
+                 else '')
+    deleted = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for batch in get_batches(target_ids):
+            cursor.execute(
+                f'DELETE FROM {quote(model._meta.db_table)} WHERE '
+                + ''.join(f'{quote(field.column)} = %s AND '
+                          for field in fields)
+                + f'{quote(link.column)} IN ({placeholders(len(batch))})'
+                + returning,
+                params + batch
+            )
+            if returning:
+                deleted.extend(row[0] for row in cursor.fetchall())
+            elif cursor.rowcount:
+                deleted.append(batch[0])
+        if deleted:
+            relations_changed.send(
+                sender=model, action='post_remove',
+                instances=[model(**{link.attname: target_id}, **values)
+                           for target_id in deleted],
+                using=connection.alias
+            )
+    return deleted
+
+
+def delete_relation(model, target, target_id, **values):
+    """Одна связь через delete_relations; возвращает, была ли она."""
+    return bool(delete_relations(model, target, (target_id,), **values))
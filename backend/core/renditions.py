@@ -0,0 +1,110 @@
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, features
+
+from core.constants import IMAGE_RENDITIONS
+from core.metrics import timer
+
+RENDITION_QUALITY = 80
+# Ключ с именем файла, из которого сделаны копии.
+RENDITIONS_SOURCE = 'source'
+# Ключ с хешем загрузки, из которой получен этот файл.
+RENDITIONS_UPLOAD = 'upload'
+# Ключ с именем загрузки, которую отклонила проверка.
+RENDITIONS_REJECTED = 'rejected'
+# Pillow 9 не умеет AVIF, а WebP может быть собран без поддержки.
+if features.check('webp'):
+    RENDITION_FORMAT, RENDITION_EXTENSION = 'WEBP', 'webp'
+else:
+    RENDITION_FORMAT, RENDITION_EXTENSION = 'JPEG', 'jpg'
+
+
+def get_renditions_field(field_name):
+    """Поле модели, в котором записаны имена копий картинки."""
+    return f'{field_name}_renditions'
+
+
+def get_renditions(field_file):
+    """Имена созданных копий картинки по названию копии.
+
+    Копии записываются в объект вместе с именем исходного файла: если
+    картинку уже заменили, а новые копии ещё не готовы, их нет.
+    """
+    if not field_file:
+        return {}
+    renditions = get_recorded_renditions(field_file)
+    if renditions.get(RENDITIONS_SOURCE) != field_file.name:
+        return {}
+    return renditions
+
+
+def get_recorded_renditions(field_file):
+    """Содержимое поля копий без сверки с текущей картинкой."""
+    return getattr(
+        field_file.instance, get_renditions_field(field_file.field.name), None
+    ) or {}
+
+
+def is_rejected(field_file):
+    """Отклонила ли проверка картинку поля (см. process_image)."""
+    return bool(field_file) and (
+        get_recorded_renditions(field_file).get(RENDITIONS_REJECTED)
+        == field_file.name)
+
+
+def is_same_upload(field_file, content):
+    """Получена ли картинка поля из загрузки с тем же содержимым.
+
+    Сохранённый файл перекодирован, поэтому сравнивается хеш исходной
+    загрузки, записанный process_image.
+    """
+    digest = get_renditions(field_file).get(RENDITIONS_UPLOAD)
+    return digest is not None and (
+        digest == field_file.storage.get_digest(content))
+
+
+def make_renditions(image, name, field, renditions):
+    """Сохраняет уменьшенные копии картинки `name` из поля `field`.
+
+    Копии, как и оригинал, именуются по хешу своего содержимого.
+    Возвращает словарь для поля копий (см. get_renditions).
+    """
+    if RENDITION_FORMAT == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+        image = image.convert(
+            'RGB' if RENDITION_FORMAT == 'JPEG' else 'RGBA')
+    created = {RENDITIONS_SOURCE: name}
+    for rendition in renditions:
+        width = IMAGE_RENDITIONS[rendition]
+        with timer(f'image.rendition.{rendition}'):
+            resized = image
+            if image.width > width:
+                resized = image.resize(
+                    (width, max(1, round(image.height * width / image.width))),
+                    Image.LANCZOS
+                )
+            output = BytesIO()
+            resized.save(output, RENDITION_FORMAT, quality=RENDITION_QUALITY)
+            created[rendition] = field.storage.save(
+                field.generate_filename(
+                    None, f'{rendition}.{RENDITION_EXTENSION}'),
+                ContentFile(output.getvalue())
+            )
+    return created
+
+
+def get_rendition_url(field_file, rendition):
+    """Адрес уменьшенной копии, если она уже создана."""
+    name = get_renditions(field_file).get(rendition)
+    return field_file.storage.url(name) if name else None
+
+
+def get_srcset(field_file, renditions, build_url=str):
+    """Значение атрибута srcset из созданных уменьшенных копий."""
+    sources = []
+    for rendition in renditions:
+        url = get_rendition_url(field_file, rendition)
+        if url:
+            sources.append(
+                f'{build_url(url)} {IMAGE_RENDITIONS[rendition]}w')
+    return ', '.join(sources) or None
@@ -1,9 +1,72 @@
-from django.utils.crypto import get_random_string
+import hashlib
+from functools import lru_cache
+from string import ascii_letters, digits
 
-from core.constants import SHORT_URL_LENGTH
+from django.conf import settings
 
+from core.constants import SHORT_CODE_LENGTH
 
-def generate_short_url(model):
-    short_url = get_random_string(SHORT_URL_LENGTH)
-    if not model.objects.filter(short_url=short_url).exists():
-        return short_url
+ALPHABET = digits + ascii_letters
+CODE_SPACE = len(ALPHABET) ** SHORT_CODE_LENGTH
+HALF_BITS = (CODE_SPACE.bit_length() + 1) // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+FEISTEL_ROUNDS = 4
+
+
+@lru_cache(maxsize=None)
+def get_short_code_key(secret):
+    return hashlib.sha256(secret.encode()).digest()
+
+
+def _round(value, number):
+    digest = hashlib.blake2b(
+        value.to_bytes(8, 'big') + bytes((number,)),
+        key=get_short_code_key(settings.SHORT_URL_SECRET), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, 'big') & HALF_MASK
+
+
+def _feistel(value, rounds):
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for number in rounds:
+        left, right = right, left ^ _round(right, number)
+    return (right << HALF_BITS) | left
+
+
+def permute(value, inverse=False):
+    """Перестановка чисел [0, CODE_SPACE), заданная секретным ключом.
+
+    Сеть Фейстеля биективна на 2 * HALF_BITS битах; значения вне
+    диапазона прогоняются повторно (cycle walking), пока не попадут в него.
+    """
+    rounds = (range(FEISTEL_ROUNDS - 1, -1, -1) if inverse
+              else range(FEISTEL_ROUNDS))
+    value = _feistel(value, rounds)
+    while value >= CODE_SPACE:
+        value = _feistel(value, rounds)
+    return value
+
+
+def encode_short_code(pk):
+    """Код короткой ссылки по id: без запросов к базе и без коллизий."""
+    if not 0 <= pk < CODE_SPACE:
+        raise ValueError(f'id вне диапазона коротких ссылок: {pk}')
+    value = permute(pk)
+    chars = []
+    for _ in range(SHORT_CODE_LENGTH):
+        value, index = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def decode_short_code(code):
+    """id по коду короткой ссылки или None, если код некорректен."""
+    if len(code) != SHORT_CODE_LENGTH:
+        return None
+    value = 0
+    for char in code:
+        index = ALPHABET.find(char)
+        if index < 0:
+            return None
+        value = value * len(ALPHABET) + index
+    return permute(value, inverse=True)
@@ -0,0 +1,60 @@
+import hashlib
+import os
+from posixpath import dirname, join, splitext
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from core.constants import RAW_IMAGE_PREFIX, STORAGE_SHARD_DEPTH
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, именующее файлы по SHA-256 содержимого.
+
+    Файл `recipes/photo.jpg` сохраняется как `recipes/ab/cd/abcd….jpg`,
+    одинаковые загрузки получают одно имя и записываются один раз. Файлы
+    не меняются после записи, поэтому их можно кешировать бессрочно.
+    Удалять их следует только через `collect_media_garbage`, который
+    учитывает все ссылки на файл.
+    """
+
+    @staticmethod
+    def get_digest(content):
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def get_content_name(self, name, content):
+        digest = self.get_digest(content)
+        basename = name.rsplit('/', 1)[-1]
+        prefix = (RAW_IMAGE_PREFIX
+                  if basename.startswith(RAW_IMAGE_PREFIX) else '')
+        shards = [digest[2 * i:2 * i + 2] for i in range(STORAGE_SHARD_DEPTH)]
+        return join(dirname(name), *shards,
+                    prefix + digest + splitext(basename)[1].lower())
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            # Обновляем время, чтобы сборщик мусора не удалил файл,
+            # на который вот-вот появится новая ссылка.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+    def walk(self, path=''):
+        directories, files = self.listdir(path)
+        for file_name in files:
+            yield join(path, file_name)
+        for directory in directories:
+            yield from self.walk(join(path, directory))
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,65 @@
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.constants import VERSION_CHECK_INTERVAL
+from core.models import DataVersion
+
+_versions = {}
+
+
+def get_version(name, create=True):
+    """Текущая метка версии набора данных `name`.
+
+    Меткой служит время последнего изменения в целых секундах, поэтому
+    её можно отдавать и как Last-Modified. Метка хранится в БД и видна
+    всем процессам, включая manage.py; прочитанное значение процесс
+    использует VERSION_CHECK_INTERVAL секунд. С `create=False` строка
+    не создаётся, а у ещё не менявшегося набора версия 0.
+    """
+    cached = _versions.get(name)
+    now = time.monotonic()
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    if create:
+        version = DataVersion.objects.get_or_create(
+            name=name, defaults={'updated_at': get_current_second()}
+        )[0].updated_at.timestamp()
+    else:
+        updated_at = DataVersion.objects.filter(name=name).values_list(
+            'updated_at', flat=True).first()
+        version = updated_at.timestamp() if updated_at else 0
+    _versions[name] = (version, now + VERSION_CHECK_INTERVAL)
+    return version
+
+
+def get_current_second():
+    return timezone.now().replace(microsecond=0)
+
+
+def bump_version(name):
+    """Сдвигает версию в текущей транзакции.
+
+    Новая метка всегда хотя бы на секунду больше старой: Last-Modified
+    с точностью до секунды иначе не отличил бы два изменения подряд.
+    Сдвиг делается одним UPDATE, который сам блокирует строку.
+    """
+    versions = DataVersion.objects.filter(name=name)
+    next_version = Greatest(
+        Value(get_current_second(), output_field=DateTimeField()),
+        F('updated_at') + timedelta(seconds=1)
+    )
+    if not versions.update(updated_at=next_version):
+        # Строку мог только что создать соседний процесс с той же
+        # меткой, поэтому после вставки версия всё равно сдвигается.
+        DataVersion.objects.bulk_create(
+            [DataVersion(name=name, updated_at=get_current_second())],
+            ignore_conflicts=True
+        )
+        versions.update(updated_at=next_version)
+    _versions.pop(name, None)
+    transaction.on_commit(lambda: _versions.pop(name, None))
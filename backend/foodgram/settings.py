@@ -14,6 +14,20 @@ SECRET_KEY = os.getenv(
 )
 DEBUG = os.getenv('DEBUG', default='true').lower() == 'true'
 
+# Ключ перестановки для коротких ссылок. После публикации ссылок
+# менять нельзя: старые коды перестанут открываться.
+SHORT_URL_SECRET = os.getenv('SHORT_URL_SECRET', default='foodgram')
+# Редирект 301 кешируется браузерами бессрочно, поэтому включается явно.
+SHORT_LINK_PERMANENT_REDIRECT = os.getenv(
+    'SHORT_LINK_PERMANENT_REDIRECT', default='false').lower() == 'true'
+SHORT_LINK_REDIRECT_MAX_AGE = int(
+    os.getenv('SHORT_LINK_REDIRECT_MAX_AGE', default=60 * 60))
+
+# Кеш токенов сбрасывается при выходе сигналом, поэтому включается
+# явно и только с общим для всех процессов CACHE_BACKEND.
+AUTH_TOKEN_CACHE = os.getenv(
+    'AUTH_TOKEN_CACHE', default='false').lower() == 'true'
+
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '127.0.0.1,localhost').split(',')
 
 INSTALLED_APPS = [
@@ -83,6 +97,16 @@ else:
         }
     }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -103,7 +127,8 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication' if AUTH_TOKEN_CACHE
+        else 'rest_framework.authentication.TokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -137,6 +162,19 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'collected_static'
 
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+MAX_IMAGE_UPLOAD_SIZE = int(
+    os.getenv('MAX_IMAGE_UPLOAD_SIZE', 10 * 1024 * 1024)
+)
+# 0 — обрабатывать картинки синхронно после фиксации транзакции.
+IMAGE_PIPELINE_WORKERS = int(os.getenv('IMAGE_PIPELINE_WORKERS', 2))
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
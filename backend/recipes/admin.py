@@ -1,18 +1,26 @@
 from django.contrib import admin
 from django.utils.safestring import mark_safe
 
+from core.admin import EstimatedCountAdminMixin
 from core.constants import INGREDIENT_MIN_AMOUNT
+from core.renditions import get_rendition_url
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             ShoppingCart, Tag)
+from recipes.service import refresh_recipe_in_shopping_lists
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     min_num = INGREDIENT_MIN_AMOUNT
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredient')
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
     list_display_links = ('name',)
     search_fields = ('name',)
@@ -26,14 +34,20 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(Favorite, ShoppingCart)
-class AuthorRecipeAdmin(admin.ModelAdmin):
+class AuthorRecipeAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
-    list_editable = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+
+    def get_readonly_fields(self, request, obj=None):
+        # Смена пользователя или рецепта в готовой записи обошла бы
+        # пересчёт счётчиков и списков покупок: её нужно пересоздать.
+        return ('user', 'recipe') if obj else ()
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'in_favorites',
+class RecipeAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'author', 'favorites_count',
                     'get_ingredients', 'get_tags', 'image_tag')
     list_display_links = ('name', 'author')
     search_fields = ('name', 'author__username')
@@ -42,6 +56,7 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ('tags',)
     empty_value_display = 'Не задано'
     inlines = (RecipeIngredientInline,)
+    autocomplete_fields = ('author',)
     fieldsets = (
         (
             None,
@@ -57,9 +72,19 @@ class RecipeAdmin(admin.ModelAdmin):
         ),
     )
 
-    @admin.display(description='В избранном')
-    def in_favorites(self, recipe):
-        return recipe.favorites.count()
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author').prefetch_related('tags', 'ingredients')
+
+    def save_related(self, request, form, formsets, change):
+        ingredient_ids = set()
+        if change:
+            ingredient_ids.update(form.instance.recipe_ingredients.values_list(
+                'ingredient_id', flat=True))
+        super().save_related(request, form, formsets, change)
+        ingredient_ids.update(form.instance.recipe_ingredients.values_list(
+            'ingredient_id', flat=True))
+        refresh_recipe_in_shopping_lists(form.instance, ingredient_ids)
 
     @admin.display(description='Ингредиенты')
     def get_ingredients(self, recipe):
@@ -74,6 +99,5 @@ class RecipeAdmin(admin.ModelAdmin):
 
     @admin.display(description='Картинка')
     def image_tag(self, recipe):
-        return mark_safe(
-            f'<img src="{recipe.image.url}" width="80" height="60" />'
-        )
+        url = get_rendition_url(recipe.image, 'thumb') or recipe.image.url
+        return mark_safe(f'<img src="{url}" width="80" height="60" />')
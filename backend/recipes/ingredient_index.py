@@ -0,0 +1,74 @@
+import threading
+from bisect import bisect_left
+from itertools import chain, islice
+
+from django.conf import settings
+
+from core.constants import INGREDIENTS_VERSION
+from core.versions import get_version
+from recipes.models import Ingredient
+from recipes.search import fold_name
+
+_lock = threading.Lock()
+_index = None
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов в памяти процесса.
+
+    Повторяет поведение поиска из recipes.search: сначала совпадения по
+    началу названия, затем остальные вхождения, внутри групп — по
+    названию и id. Строки должны приходить в порядке name, id из базы,
+    чтобы порядок совпадал с её правилами сравнения.
+    """
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.ingredients = [
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for pk, name, unit in rows
+        ]
+        self.folded = [
+            fold_name(ingredient['name']) for ingredient in self.ingredients
+        ]
+        self.prefixes = sorted(
+            (name, position) for position, name in enumerate(self.folded)
+        )
+
+    def search(self, query, measurement_unit=None, limit=None):
+        query = fold_name(query)
+        positions = []
+        start = bisect_left(self.prefixes, (query,))
+        for name, position in self.prefixes[start:]:
+            if not name.startswith(query):
+                break
+            positions.append(position)
+        positions.sort()
+        prefix_matches = set(positions)
+        substring_matches = (
+            position for position, name in enumerate(self.folded)
+            if query in name and position not in prefix_matches
+        )
+        results = (self.ingredients[position]
+                   for position in chain(positions, substring_matches))
+        if measurement_unit:
+            results = (ingredient for ingredient in results
+                       if ingredient['measurement_unit'] == measurement_unit)
+        return list(islice(
+            results, limit or settings.INGREDIENT_SEARCH_LIMIT
+        ))
+
+
+def get_ingredient_index():
+    """Индекс текущей версии; перестраивается при её смене."""
+    global _index
+    version = get_version(INGREDIENTS_VERSION)
+    if _index is None or _index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = IngredientIndex(
+                    Ingredient.objects.order_by('name', 'id').values_list(
+                        'id', 'name', 'measurement_unit').iterator(),
+                    version
+                )
+    return _index
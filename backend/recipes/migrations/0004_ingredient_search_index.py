@@ -0,0 +1,77 @@
+# Generated by Django 3.2.3 on 2026-10-18 04:20
+
+from django.db import OperationalError, migrations
+
+POSTGRESQL_FORWARD = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_trgm '
+    'ON recipes_ingredient USING gin (UPPER(name::text) gin_trgm_ops)',
+)
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS recipes_ingredient_name_trgm',
+)
+SQLITE_FORWARD = (
+    "CREATE VIRTUAL TABLE recipes_ingredient_fts USING fts5("
+    "name, content='recipes_ingredient', content_rowid='id', "
+    "tokenize='trigram')",
+    'CREATE TRIGGER recipes_ingredient_fts_insert '
+    'AFTER INSERT ON recipes_ingredient BEGIN '
+    'INSERT INTO recipes_ingredient_fts(rowid, name) '
+    'VALUES (new.id, new.name); END',
+    'CREATE TRIGGER recipes_ingredient_fts_delete '
+    'AFTER DELETE ON recipes_ingredient BEGIN '
+    "INSERT INTO recipes_ingredient_fts(recipes_ingredient_fts, rowid, name) "
+    "VALUES ('delete', old.id, old.name); END",
+    'CREATE TRIGGER recipes_ingredient_fts_update '
+    'AFTER UPDATE OF name ON recipes_ingredient BEGIN '
+    "INSERT INTO recipes_ingredient_fts(recipes_ingredient_fts, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    'INSERT INTO recipes_ingredient_fts(rowid, name) '
+    'VALUES (new.id, new.name); END',
+    "INSERT INTO recipes_ingredient_fts(recipes_ingredient_fts) "
+    "VALUES ('rebuild')",
+)
+SQLITE_BACKWARD = (
+    'DROP TRIGGER IF EXISTS recipes_ingredient_fts_insert',
+    'DROP TRIGGER IF EXISTS recipes_ingredient_fts_delete',
+    'DROP TRIGGER IF EXISTS recipes_ingredient_fts_update',
+    'DROP TABLE IF EXISTS recipes_ingredient_fts',
+)
+
+
+def run_statements(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRESQL_FORWARD)
+    elif vendor == 'sqlite':
+        try:
+            run_statements(schema_editor, SQLITE_FORWARD[:1])
+        except OperationalError:
+            # SQLite без FTS5 или триграммного токенизатора (< 3.34):
+            # поиск работает через LIKE.
+            return
+        run_statements(schema_editor, SQLITE_FORWARD[1:])
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRESQL_BACKWARD)
+    elif vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
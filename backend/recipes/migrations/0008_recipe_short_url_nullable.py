@@ -0,0 +1,24 @@
+# Generated by Django 3.2.3 on 2026-10-18 04:29
+
+from django.db import migrations, models
+
+
+def blank_to_null(apps, schema_editor):
+    apps.get_model('recipes', 'Recipe').objects.filter(
+        short_url='').update(short_url=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_alter_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='short_url',
+            field=models.CharField(blank=True, help_text='Только у старых рецептов; у новых код вычисляется по id.', max_length=10, null=True, unique=True, verbose_name='Короткая ссылка'),
+        ),
+        migrations.RunPython(blank_to_null, migrations.RunPython.noop),
+    ]
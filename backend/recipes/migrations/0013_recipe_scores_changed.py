@@ -0,0 +1,22 @@
+# Generated by Django 3.2.3 on 2026-10-18 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='scores_changed',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Оценки устарели'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('scores_changed', True)), fields=['id'], name='recipe_scores_changed_idx'),
+        ),
+    ]
@@ -6,8 +6,10 @@ from core.constants import (COOKING_MIN_TIME, INGREDIENT_MAX_LENGTH,
                             INGREDIENT_MIN_AMOUNT, MAX_POSITIVE_VALUE,
                             RECIPE_MAX_LENGTH, SHORT_URL_MAX_LENGTH,
                             TAG_MAX_LENGTH)
+from core.counters import CounterFieldsMixin
 from core.models import UserRecipeModel
-from core.service import generate_short_url
+from core.service import encode_short_code
+from core.storage import content_storage
 
 User = get_user_model()
 
@@ -58,7 +60,7 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -89,7 +91,11 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         'Картинка',
-        upload_to='recipes/'
+        upload_to='recipes/',
+        storage=content_storage
+    )
+    image_renditions = models.JSONField(
+        'Копии картинки', default=dict, blank=True, editable=False
     )
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -104,23 +110,52 @@ class Recipe(models.Model):
         'Короткая ссылка',
         max_length=SHORT_URL_MAX_LENGTH,
         unique=True,
-        blank=True
+        blank=True,
+        null=True,
+        help_text='Только у старых рецептов; у новых код вычисляется по id.'
+    )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False
+    )
+    popularity = models.FloatField(
+        'Популярность', default=0, editable=False
+    )
+    trending = models.FloatField('Тренд', default=0, editable=False)
+    scores_changed = models.BooleanField(
+        'Оценки устарели', default=False, editable=False
+    )
+    short_link_hits = models.PositiveIntegerField(
+        'Переходов по короткой ссылке', default=0, editable=False
     )
     created_at = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+
+    counter_fields = ('favorites_count', 'popularity', 'trending',
+                      'scores_changed', 'short_link_hits')
 
     class Meta:
-        ordering = ('-created_at',)
+        ordering = ('-created_at', '-id')
         default_related_name = 'recipes'
+        indexes = (
+            models.Index(fields=('-created_at', '-id'),
+                         name='recipe_created_at_id_idx'),
+            models.Index(fields=('-popularity', '-id'),
+                         name='recipe_popularity_id_idx'),
+            models.Index(fields=('-trending', '-id'),
+                         name='recipe_trending_id_idx'),
+            models.Index(fields=('id',),
+                         condition=models.Q(scores_changed=True),
+                         name='recipe_scores_changed_idx'),
+        )
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        if not self.short_url:
-            self.short_url = generate_short_url(self.__class__)
-        super().save(*args, **kwargs)
+    @property
+    def short_code(self):
+        return self.short_url or encode_short_code(self.pk)
 
 
 class RecipeIngredient(models.Model):
@@ -172,3 +207,32 @@ class ShoppingCart(UserRecipeModel):
         default_related_name = 'shopping_cart'
         verbose_name = 'Корзина'
         verbose_name_plural = verbose_name
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField('Общее количество')
+
+    class Meta:
+        default_related_name = 'shopping_list_items'
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item'
+            ),
+        )
+
+    def __str__(self):
+        return (f'{self.user}: {self.ingredient.name} - '
+                f'{self.total_amount}, {self.ingredient.measurement_unit}')
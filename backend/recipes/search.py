@@ -0,0 +1,69 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import (Case, CharField, F, Func, IntegerField, Q, Value,
+                              When)
+from django.db.models.expressions import RawSQL
+
+INGREDIENT_FTS_TABLE = 'recipes_ingredient_fts'
+TRIGRAM_LENGTH = 3
+FOLD_FUNCTION = 'foodgram_fold'
+
+
+def fold_name(value):
+    """Название для сравнения без учёта регистра, как UPPER в PostgreSQL.
+
+    UPPER в базе меняет каждый символ на один, а str.upper() раскрывает
+    некоторые буквы в несколько (ß → SS); такие буквы остаются как есть.
+    В SQLite функция регистрируется как FOLD_FUNCTION: встроенные UPPER
+    и LIKE учитывают регистр только у латиницы.
+    """
+    if value is None:
+        return None
+    return ''.join(
+        upper if len(upper) == 1 else char
+        for char, upper in ((char, char.upper()) for char in value)
+    )
+
+
+@lru_cache(maxsize=None)
+def has_fts_table(alias):
+    return (INGREDIENT_FTS_TABLE
+            in connections[alias].introspection.table_names())
+
+
+def search_ingredients(queryset, query):
+    """Ингредиенты, содержащие `query`: сначала совпадения по началу.
+
+    На PostgreSQL подстрочный поиск обслуживает GIN-индекс pg_trgm, на
+    SQLite — FTS5-таблица с триграммным токенизатором. Запросы короче
+    трёх символов триграммы не покрывают, для них остаётся LIKE.
+    """
+    if connection.vendor == 'sqlite':
+        if len(query) >= TRIGRAM_LENGTH and has_fts_table(connection.alias):
+            fts_query = '"{}"'.format(query.replace('"', '""'))
+            queryset = queryset.filter(id__in=RawSQL(
+                f'SELECT rowid FROM {INGREDIENT_FTS_TABLE} '
+                f'WHERE {INGREDIENT_FTS_TABLE} MATCH %s',
+                (fts_query,)
+            ))
+        folded = fold_name(query)
+        queryset = queryset.annotate(folded_name=Func(
+            F('name'), function=FOLD_FUNCTION, output_field=CharField()
+        )).filter(folded_name__contains=folded)
+        is_prefix = Q(folded_name__startswith=folded)
+    else:
+        queryset = queryset.filter(name__icontains=query)
+        is_prefix = Q(name__istartswith=query)
+    return queryset.annotate(
+        prefix_rank=Case(
+            When(is_prefix, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField()
+        )
+    ).order_by('prefix_rank', 'name', 'id')
+
+
+def limit_search_results(queryset):
+    return queryset[:settings.INGREDIENT_SEARCH_LIMIT]
@@ -0,0 +1,297 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum, Window
+from django.db.models.functions import RowNumber, TruncDay, TruncHour
+from django.utils import timezone
+
+from core.constants import (FAVORITE_SCORE_WEIGHT, POPULARITY_HALF_LIFE_DAYS,
+                            RECIPE_SCORES_BATCH_SIZE, RECIPE_SCORES_VERSION,
+                            RESPONSE_CACHE_TIMEOUT, SCORES_REBASE_DAYS,
+                            SHOPPING_CART_SCORE_WEIGHT,
+                            SHOPPING_LIST_BATCH_SIZE, TRENDING_HALF_LIFE_HOURS,
+                            TRENDING_WINDOW_DAYS)
+from core.models import DataVersion
+from core.versions import bump_version, get_version
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+
+User = get_user_model()
+
+USER_RECIPE_IDS_KEY = '{}:{}:{}'
+USER_RECIPE_IDS_VERSION = '{}:{}'
+RECIPE_PREVIEW_FIELDS = ('id', 'author_id', 'name', 'image',
+                         'image_renditions', 'cooking_time', 'created_at')
+
+_touch_suspended = threading.local()
+
+
+def get_recipes_limit(request):
+    """Значение `recipes_limit` из запроса, разбирается один раз."""
+    if not hasattr(request, '_recipes_limit'):
+        try:
+            recipes_limit = int(request.query_params['recipes_limit'])
+        except (KeyError, ValueError):
+            recipes_limit = None
+        if recipes_limit is not None and recipes_limit < 0:
+            recipes_limit = None
+        request._recipes_limit = recipes_limit
+    return request._recipes_limit
+
+
+def get_recipes_by_author(author_ids, limit=None):
+    """Последние рецепты авторов одним запросом, по id автора.
+
+    При заданном `limit` для каждого автора берётся не более `limit`
+    рецептов через ROW_NUMBER() OVER (PARTITION BY author_id); если
+    база не поддерживает оконные функции, лишнее отсекается в Python.
+    """
+    queryset = Recipe.objects.filter(
+        author_id__in=author_ids
+    ).only(*RECIPE_PREVIEW_FIELDS)
+    if limit is not None and connection.features.supports_over_clause:
+        ranked = queryset.annotate(
+            recipe_rank=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=(F('created_at').desc(), F('id').desc())
+            )
+        ).order_by().values(*RECIPE_PREVIEW_FIELDS, 'recipe_rank')
+        sql, params = ranked.query.sql_with_params()
+        queryset = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE recipe_rank <= %s '
+            'ORDER BY created_at DESC, id DESC',
+            (*params, limit)
+        )
+    recipes_by_author = defaultdict(list)
+    for recipe in queryset:
+        recipes = recipes_by_author[recipe.author_id]
+        if limit is None or len(recipes) < limit:
+            recipes.append(recipe)
+    return recipes_by_author
+
+
+def get_shopping_list_totals(user_ids=None, ingredient_ids=None):
+    """Суммы ингредиентов по корзинам пользователей."""
+    carts = ShoppingCart.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+    if ingredient_ids is not None:
+        carts = carts.filter(
+            recipe__recipe_ingredients__ingredient_id__in=ingredient_ids
+        )
+    return (
+        carts.values('user_id',
+                     ingredient_id=F('recipe__recipe_ingredients__ingredient'))
+        .annotate(total_amount=Sum('recipe__recipe_ingredients__amount'))
+        .filter(ingredient_id__isnull=False)
+        .order_by()
+    )
+
+
+def lock_users(user_ids=None):
+    """Блокирует строки пользователей до конца транзакции.
+
+    Без блокировки два параллельных пересчёта одного списка оба удаляют
+    старые строки и оба вставляют новые, нарушая уникальность. Порядок
+    по id исключает взаимные блокировки.
+    """
+    users = User.objects.select_for_update().order_by('pk')
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    list(users.values_list('pk', flat=True))
+
+
+@transaction.atomic
+def refresh_shopping_list(user_ids=None, ingredient_ids=None):
+    """Пересчёт списка покупок для заданных пользователей и ингредиентов.
+
+    `user_ids` может быть подзапросом; `None` означает «все».
+    """
+    lock_users(user_ids)
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    if ingredient_ids is not None:
+        items = items.filter(ingredient_id__in=ingredient_ids)
+    items.delete()
+    ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(**total)
+         for total in get_shopping_list_totals(
+             user_ids, ingredient_ids).iterator()),
+        batch_size=SHOPPING_LIST_BATCH_SIZE
+    )
+
+
+def refresh_recipe_in_shopping_lists(recipe, ingredient_ids):
+    """Пересчёт списков покупок всех, у кого рецепт лежит в корзине."""
+    refresh_shopping_list(
+        ShoppingCart.objects.filter(recipe=recipe).values('user_id'),
+        ingredient_ids
+    )
+
+
+def get_user_recipe_ids_version(model, user_id):
+    return USER_RECIPE_IDS_VERSION.format(model._meta.model_name, user_id)
+
+
+def get_user_recipe_ids(model, user):
+    """Id рецептов пользователя в избранном или корзине (`model`).
+
+    Ключ кеша содержит версию из БД: сброс виден всем процессам, даже
+    если кеш у каждого свой.
+    """
+    if not user.is_authenticated:
+        return set()
+    version = get_version(get_user_recipe_ids_version(model, user.id),
+                          create=False)
+    key = USER_RECIPE_IDS_KEY.format(model._meta.model_name, user.id, version)
+    recipe_ids = cache.get(key)
+    if recipe_ids is None:
+        recipe_ids = set(model.objects.filter(
+            user=user).values_list('recipe_id', flat=True))
+        cache.set(key, recipe_ids, RESPONSE_CACHE_TIMEOUT)
+    return recipe_ids
+
+
+def invalidate_user_recipe_ids(model, user_id):
+    bump_version(get_user_recipe_ids_version(model, user_id))
+
+
+def touch_recipes(recipes):
+    """Сдвигает updated_at, чтобы сбросить закешированные тела рецептов."""
+    recipes.update(updated_at=timezone.now())
+
+
+@contextmanager
+def suspend_recipe_touch(recipe):
+    """Правки состава `recipe` в блоке не сдвигают его updated_at.
+
+    Для кода, который после правки сам сохраняет рецепт: сигналы строк
+    состава тогда не пишут в рецепт по разу на строку.
+    """
+    recipe_ids = getattr(_touch_suspended, 'recipe_ids', None)
+    if recipe_ids is None:
+        recipe_ids = _touch_suspended.recipe_ids = set()
+    recipe_ids.add(recipe.pk)
+    try:
+        yield
+    finally:
+        recipe_ids.discard(recipe.pk)
+
+
+def is_recipe_touch_suspended(recipe_id):
+    return recipe_id in getattr(_touch_suspended, 'recipe_ids', ())
+
+
+def get_scores_anchor(now):
+    """Точка отсчёта оценок: начало текущего периода SCORES_REBASE_DAYS.
+
+    Оценки всех рецептов приведены к одному моменту, поэтому затухание
+    не меняет их порядка и рецепты без новых событий можно не
+    пересчитывать. Вклад событий после точки отсчёта растёт, а при
+    смене периода оценки пересчитываются целиком.
+    """
+    period = timedelta(days=SCORES_REBASE_DAYS).total_seconds()
+    return datetime.fromtimestamp(now.timestamp() // period * period,
+                                  tz=timezone.utc)
+
+
+def get_decayed_scores(anchor, half_life, trunc, since=None,
+                       recipe_ids=None):
+    """Сумма добавлений в избранное и корзину с экспоненциальным затуханием.
+
+    События группируются в базе по интервалам `trunc`, вклад интервала
+    уменьшается вдвое каждые `half_life` до момента `anchor`.
+    """
+    scores = defaultdict(float)
+    for model, weight in ((Favorite, FAVORITE_SCORE_WEIGHT),
+                          (ShoppingCart, SHOPPING_CART_SCORE_WEIGHT)):
+        events = model.objects.all()
+        if since is not None:
+            events = events.filter(created_at__gte=since)
+        if recipe_ids is not None:
+            events = events.filter(recipe_id__in=recipe_ids)
+        buckets = events.annotate(bucket=trunc('created_at')).values(
+            'recipe_id', 'bucket').annotate(total=Count('id')).order_by()
+        for row in buckets.iterator():
+            age = (anchor - row['bucket']) / half_life
+            scores[row['recipe_id']] += weight * row['total'] * 0.5 ** age
+    return scores
+
+
+def mark_scores_changed(recipe_ids):
+    """Отмечает рецепты, оценки которых пересчитает refresh_recipe_scores."""
+    Recipe.objects.filter(pk__in=recipe_ids, scores_changed=False).update(
+        scores_changed=True)
+
+
+def get_changed_recipe_ids(now, last_run):
+    """Рецепты, у которых с прошлого пересчёта поменялись события.
+
+    Кроме отмеченных сигналами, это рецепты, события которых с тех пор
+    вышли из окна тренда.
+    """
+    changed = Recipe.objects.filter(scores_changed=True)
+    recipe_ids = set(changed.values_list('pk', flat=True))
+    # Флаг снимается до чтения событий: изменение после этого снова
+    # отметит рецепт и попадёт в следующий пересчёт.
+    changed.filter(pk__in=recipe_ids).update(scores_changed=False)
+    window = timedelta(days=TRENDING_WINDOW_DAYS)
+    for model in (Favorite, ShoppingCart):
+        recipe_ids.update(model.objects.filter(
+            created_at__gte=last_run - window, created_at__lt=now - window
+        ).values_list('recipe_id', flat=True).distinct())
+    return recipe_ids
+
+
+def get_recipe_scores(now, anchor, recipe_ids=None):
+    """Оценки (popularity, trending) рецептов по id."""
+    popularity = get_decayed_scores(
+        anchor, timedelta(days=POPULARITY_HALF_LIFE_DAYS), TruncDay,
+        recipe_ids=recipe_ids)
+    trending = get_decayed_scores(
+        anchor, timedelta(hours=TRENDING_HALF_LIFE_HOURS), TruncHour,
+        since=now - timedelta(days=TRENDING_WINDOW_DAYS),
+        recipe_ids=recipe_ids)
+    return {pk: (popularity.get(pk, 0), trending.get(pk, 0))
+            for pk in popularity.keys() | trending.keys()}
+
+
+@transaction.atomic
+def refresh_recipe_scores(now=None, full=False):
+    """Пересчитывает столбцы popularity и trending у рецептов.
+
+    Пересчитываются только рецепты с изменившимися событиями, а все —
+    при `full`, первом запуске и смене точки отсчёта.
+    """
+    now = now or timezone.now()
+    anchor = get_scores_anchor(now)
+    state, created = DataVersion.objects.select_for_update().get_or_create(
+        name=RECIPE_SCORES_VERSION, defaults={'updated_at': now})
+    if created or full or get_scores_anchor(state.updated_at) != anchor:
+        Recipe.objects.filter(scores_changed=True).update(
+            scores_changed=False)
+        scores = get_recipe_scores(now, anchor)
+        recipe_ids = scores.keys() | set(Recipe.objects.exclude(
+            popularity=0, trending=0).values_list('pk', flat=True))
+    else:
+        recipe_ids = list(get_changed_recipe_ids(now, state.updated_at))
+        scores = {}
+        for start in range(0, len(recipe_ids), RECIPE_SCORES_BATCH_SIZE):
+            scores.update(get_recipe_scores(
+                now, anchor,
+                recipe_ids[start:start + RECIPE_SCORES_BATCH_SIZE]))
+    recipes = []
+    for pk in recipe_ids:
+        popularity, trending = scores.get(pk, (0, 0))
+        recipes.append(Recipe(pk=pk, popularity=popularity, trending=trending))
+    Recipe.objects.bulk_update(recipes, ('popularity', 'trending'),
+                               batch_size=RECIPE_SCORES_BATCH_SIZE)
+    state.updated_at = now
+    state.save(update_fields=('updated_at',))
+    return len(recipe_ids)
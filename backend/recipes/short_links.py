@@ -0,0 +1,124 @@
+import atexit
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import cache
+
+from core.constants import (SHORT_LINK_CACHE_TIMEOUT,
+                            SHORT_LINK_HITS_FLUSH_INTERVAL,
+                            SHORT_LINK_HITS_FLUSH_SIZE,
+                            SHORT_LINK_LOCAL_CACHE_SIZE,
+                            SHORT_LINK_LOCAL_TIMEOUT,
+                            SHORT_LINK_NEGATIVE_TIMEOUT)
+from core.counters import add_to_counters
+from core.metrics import increment
+from core.service import decode_short_code
+from recipes.models import Recipe
+
+SHORT_LINK_KEY = 'short-link:{}'
+# В общем кеше несуществующая ссылка хранится как 0.
+MISSING = 0
+
+
+class LocalCache:
+    """LRU в памяти процесса с временем жизни записей."""
+
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.items[key] = (value, time.monotonic() + timeout)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+
+_local = LocalCache(SHORT_LINK_LOCAL_CACHE_SIZE)
+_hits = Counter()
+_hits_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def find_recipe_id(code):
+    pk = decode_short_code(code)
+    recipes = (Recipe.objects.filter(short_url=code) if pk is None
+               else Recipe.objects.filter(pk=pk))
+    return recipes.values_list('pk', flat=True).first() or MISSING
+
+
+def resolve_short_code(code):
+    """id рецепта по коду короткой ссылки или None.
+
+    Сначала ищет в LRU процесса, затем в общем кеше и только потом в
+    базе. Отсутствующие коды кешируются на SHORT_LINK_NEGATIVE_TIMEOUT.
+    """
+    pk = _local.get(code)
+    if pk is not None:
+        increment('short_link.local_hit')
+    else:
+        key = SHORT_LINK_KEY.format(code)
+        pk = cache.get(key)
+        if pk is not None:
+            increment('short_link.cache_hit')
+        else:
+            increment('short_link.miss')
+            pk = find_recipe_id(code)
+            cache.set(key, pk, SHORT_LINK_CACHE_TIMEOUT if pk
+                      else SHORT_LINK_NEGATIVE_TIMEOUT)
+        _local.set(code, pk, SHORT_LINK_LOCAL_TIMEOUT if pk
+                   else SHORT_LINK_NEGATIVE_TIMEOUT)
+    return pk or None
+
+
+def forget_short_codes(codes):
+    """Убирает коды из кешей, например после удаления рецепта.
+
+    LRU других процессов очистится сам через SHORT_LINK_LOCAL_TIMEOUT.
+    """
+    cache.delete_many([SHORT_LINK_KEY.format(code) for code in codes])
+    for code in codes:
+        _local.delete(code)
+
+
+def record_hit(pk):
+    """Учитывает переход; счётчики пишутся в базу пачками."""
+    with _hits_lock:
+        _hits[pk] += 1
+        due = (sum(_hits.values()) >= SHORT_LINK_HITS_FLUSH_SIZE
+               or time.monotonic() - _flushed_at
+               >= SHORT_LINK_HITS_FLUSH_INTERVAL)
+    if due:
+        flush_hits()
+
+
+def flush_hits():
+    """Записывает накопленные счётчики одним UPDATE."""
+    global _flushed_at
+    with _hits_lock:
+        hits = dict(_hits)
+        _hits.clear()
+        _flushed_at = time.monotonic()
+    add_to_counters(Recipe, 'short_link_hits', hits)
+
+
+atexit.register(flush_hits)
@@ -0,0 +1,197 @@
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+
+from core.constants import (INGREDIENTS_VERSION, RECIPE_IMAGE_RENDITIONS,
+                            TAGS_VERSION)
+from core.counters import add_to_counters, change_counter
+from core.images import schedule_image_processing
+from core.relations import get_counter_deltas, relations_changed
+from core.service import encode_short_code
+from core.versions import bump_version
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.search import FOLD_FUNCTION, fold_name
+from recipes.service import (invalidate_user_recipe_ids,
+                             is_recipe_touch_suspended, mark_scores_changed,
+                             refresh_shopping_list, touch_recipes)
+from recipes.short_links import forget_short_codes
+
+User = get_user_model()
+
+
+@receiver(connection_created)
+def register_fold_function(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            FOLD_FUNCTION, 1, fold_name, deterministic=True)
+
+
+def get_recipe_ingredient_ids(recipe_id):
+    return list(RecipeIngredient.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient_id', flat=True))
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        refresh_shopping_list(
+            (instance.user_id,), get_recipe_ingredient_ids(instance.recipe_id)
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remember_cart_ingredients(sender, instance, **kwargs):
+    # При каскадном удалении рецепта его ингредиенты могут быть удалены
+    # раньше строки корзины, поэтому запоминаем их заранее.
+    instance._ingredient_ids = get_recipe_ingredient_ids(instance.recipe_id)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    refresh_shopping_list((instance.user_id,), instance._ingredient_ids)
+
+
+@receiver(relations_changed, sender=ShoppingCart)
+def change_shopping_lists(sender, instances, **kwargs):
+    # Один пересчёт на все рецепты, добавленные или убранные разом.
+    ingredient_ids = set(RecipeIngredient.objects.filter(
+        recipe_id__in={instance.recipe_id for instance in instances}
+    ).values_list('ingredient_id', flat=True))
+    if ingredient_ids:
+        refresh_shopping_list(
+            {instance.user_id for instance in instances}, ingredient_ids)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def reset_user_recipe_ids(sender, instance, **kwargs):
+    invalidate_user_recipe_ids(sender, instance.user_id)
+
+
+@receiver(relations_changed, sender=Favorite)
+@receiver(relations_changed, sender=ShoppingCart)
+def reset_changed_user_recipe_ids(sender, instances, **kwargs):
+    for user_id in {instance.user_id for instance in instances}:
+        invalidate_user_recipe_ids(sender, user_id)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def touch_recipe_of_ingredient(sender, instance, **kwargs):
+    if not is_recipe_touch_suspended(instance.recipe_id):
+        touch_recipes(Recipe.objects.filter(pk=instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipes_on_m2m(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif pk_set:
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    touch_recipes(Recipe.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Tag)
+def touch_tag_recipes(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    bump_version(INGREDIENTS_VERSION)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    bump_version(TAGS_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, **kwargs):
+    schedule_image_processing(instance, 'image', RECIPE_IMAGE_RENDITIONS)
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_recipe_short_codes(sender, instance, **kwargs):
+    forget_short_codes({instance.short_code, encode_short_code(instance.pk)})
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(relations_changed, sender=Favorite)
+def change_favorites_counts(sender, instances, action, **kwargs):
+    add_to_counters(Recipe, 'favorites_count',
+                    get_counter_deltas(instances, 'recipe_id', action))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def mark_added_recipe_scores(sender, instance, created, **kwargs):
+    if created:
+        mark_scores_changed((instance.recipe_id,))
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def mark_removed_recipe_scores(sender, instance, **kwargs):
+    mark_scores_changed((instance.recipe_id,))
+
+
+@receiver(relations_changed, sender=Favorite)
+@receiver(relations_changed, sender=ShoppingCart)
+def mark_changed_recipe_scores(sender, instances, **kwargs):
+    mark_scores_changed({instance.recipe_id for instance in instances})
+
+
+@receiver(post_init, sender=Recipe)
+def remember_recipe_author(sender, instance, **kwargs):
+    # Через __dict__, чтобы не загружать отложенное поле.
+    instance._loaded_author_id = instance.__dict__.get('author_id')
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipes_count(sender, instance, created, **kwargs):
+    previous = None if created else instance._loaded_author_id
+    if previous != instance.author_id:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+        if previous is not None:
+            change_counter(User, previous, 'recipes_count', -1)
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
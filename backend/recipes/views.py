@@ -1,8 +1,19 @@
-from django.shortcuts import get_object_or_404, redirect
+from django.conf import settings
+from django.http import Http404, HttpResponsePermanentRedirect
+from django.shortcuts import redirect
+from django.utils.cache import patch_cache_control
 
-from .models import Recipe
+from recipes.short_links import record_hit, resolve_short_code
 
 
 def redirect_to_original(request, slug):
-    recipe = get_object_or_404(Recipe, short_url=slug)
-    return redirect(f'/recipes/{recipe.pk}/')
+    pk = resolve_short_code(slug)
+    if pk is None:
+        raise Http404('Короткая ссылка не найдена.')
+    record_hit(pk)
+    response = redirect(f'/recipes/{pk}/')
+    if settings.SHORT_LINK_PERMANENT_REDIRECT:
+        response = HttpResponsePermanentRedirect(response.url)
+    patch_cache_control(response, public=True,
+                        max_age=settings.SHORT_LINK_REDIRECT_MAX_AGE)
+    return response
@@ -0,0 +1,71 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import versions
+from recipes import ingredient_index
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def isolated(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_PIPELINE_WORKERS = 0
+    cache.clear()
+    # Состояние процесса переживает откат БД между тестами.
+    versions._versions.clear()
+    ingredient_index._index = None
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def make_user(db):
+    def make(username='user'):
+        return User.objects.create_user(
+            username=username, email=f'{username}@example.com',
+            first_name='Имя', last_name='Фамилия', password='Passw0rd!x'
+        )
+    return make
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+    return client
+
+
+@pytest.fixture
+def make_recipes(user):
+    """Рецепты с заданным числом ингредиентов и двумя тегами."""
+    def make(count, ingredients=3):
+        tags = [Tag.objects.get_or_create(name=f'Тег {i}', slug=f'tag{i}')[0]
+                for i in range(2)]
+        items = [
+            Ingredient.objects.get_or_create(
+                name=f'Ингредиент {i}', measurement_unit='г')[0]
+            for i in range(ingredients)
+        ]
+        recipes = []
+        for number in range(count):
+            recipe = Recipe.objects.create(
+                author=user, name=f'Рецепт {number}', text='Текст',
+                cooking_time=10, image='recipes/image.jpg'
+            )
+            recipe.tags.set(tags)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=item, amount=1)
+                for item in items
+            )
+            recipes.append(recipe)
+        return recipes
+    return make
@@ -0,0 +1,74 @@
+import pickle
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CachedTokenAuthentication
+from users.models import User
+from users.service import get_token_cache_key
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user).key
+
+
+def authenticate(key):
+    return CachedTokenAuthentication().authenticate_credentials(key)[0]
+
+
+def test_cache_holds_no_credentials(user, token):
+    authenticate(token)
+    cached = cache.get(get_token_cache_key(token))
+    assert cached[0]['id'] == user.pk
+    assert user.password.encode() not in pickle.dumps(cached)
+
+
+def test_hit_needs_no_queries(user, token, django_assert_num_queries):
+    authenticate(token)
+    with django_assert_num_queries(0):
+        cached = authenticate(token)
+        assert cached == user
+        assert (cached.username, cached.email) == (user.username, user.email)
+
+
+def test_user_from_cache_keeps_password_on_save(user, token):
+    authenticate(token)
+    cached = authenticate(token)
+    cached.first_name = 'Другое'
+    cached.save()
+    assert User.objects.get(pk=user.pk).check_password('Passw0rd!x')
+
+
+def test_deactivation(user, token):
+    authenticate(token)
+    user.is_active = False
+    user.save()
+    with pytest.raises(AuthenticationFailed):
+        authenticate(token)
+
+
+def test_password_change(user, token):
+    authenticate(token)
+    version = cache.get(get_token_cache_key(token))[1]
+    user.set_password('An0ther-passw0rd')
+    user.save()
+    assert authenticate(token) == user
+    assert cache.get(get_token_cache_key(token))[1] != version
+
+
+def test_logout_forgets_token(user, token):
+    authenticate(token)
+    Token.objects.filter(key=token).delete()
+    with pytest.raises(AuthenticationFailed):
+        authenticate(token)
+
+
+def test_requires_shared_cache(settings):
+    settings.AUTH_TOKEN_CACHE = True
+    with pytest.raises(SystemCheckError):
+        call_command('check')
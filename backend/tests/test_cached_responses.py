@@ -0,0 +1,56 @@
+from unittest import mock
+
+import pytest
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from core.constants import TAGS_VERSION
+from core.models import DataVersion
+from core.versions import bump_version, get_version
+from recipes.models import Tag
+
+
+@pytest.fixture
+def tag(db):
+    return Tag.objects.create(name='Завтрак', slug='breakfast')
+
+
+def test_etag_revalidation(tag):
+    client = APIClient()
+    etag = client.get('/api/tags/')['ETag']
+    assert client.get('/api/tags/',
+                      HTTP_IF_NONE_MATCH=etag).status_code == 304
+    Tag.objects.create(name='Обед', slug='lunch')
+    response = client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_second_change_within_last_modified_second(tag):
+    version = get_version(TAGS_VERSION)
+    stamp = DataVersion.objects.get(name=TAGS_VERSION).updated_at
+    client = APIClient()
+    with mock.patch('api.mixins.time.time', return_value=version + 5):
+        last_modified = client.get('/api/tags/')['Last-Modified']
+        assert last_modified == http_date(version)
+        # Второе изменение в ту же секунду, что и отданный Last-Modified.
+        with mock.patch('core.versions.timezone.now',
+                        return_value=stamp.replace(microsecond=500000)):
+            Tag.objects.create(name='Обед', slug='lunch')
+        assert get_version(TAGS_VERSION) == version + 1
+        response = client.get('/api/tags/',
+                              HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert client.get(
+            '/api/tags/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code == 304
+
+
+def test_future_version_has_no_last_modified(tag):
+    bump_version(TAGS_VERSION)
+    bump_version(TAGS_VERSION)
+    response = APIClient().get('/api/tags/')
+    assert response.status_code == 200
+    assert 'ETag' in response
+    assert 'Last-Modified' not in response
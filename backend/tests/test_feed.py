@@ -0,0 +1,40 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from core import versions
+from recipes.models import Favorite
+
+
+@pytest.fixture(autouse=True)
+def hosts(settings):
+    settings.ALLOWED_HOSTS = ['testserver', 'foodgram.example']
+
+
+@pytest.mark.parametrize('secure, host', (
+    (False, 'testserver'), (True, 'foodgram.example'),
+))
+def test_cached_bodies_use_request_origin(make_recipes, secure, host):
+    make_recipes(2)
+    # Первым тела кеширует запрос с другого адреса.
+    APIClient().get('/api/recipes/', HTTP_HOST='foodgram.example')
+    APIClient().get('/api/recipes/', secure=True)
+    response = APIClient().get('/api/recipes/', secure=secure,
+                               HTTP_HOST=host)
+    origin = f'{"https" if secure else "http"}://{host}/'
+    images = [recipe['image'] for recipe in response.json()['results']]
+    assert images and all(image.startswith(origin) for image in images)
+
+
+def test_user_recipe_ids_follow_other_processes(client, user, make_recipes):
+    first, second = make_recipes(2)
+    Favorite.objects.create(user=user, recipe=first)
+    client.get('/api/recipes/')
+    # Локальный кеш другого процесса: в нём осталось прежнее множество.
+    stale = cache._cache.copy(), cache._expire_info.copy()
+    Favorite.objects.create(user=user, recipe=second)
+    cache._cache.update(stale[0])
+    cache._expire_info.update(stale[1])
+    versions._versions.clear()
+    results = client.get('/api/recipes/').json()['results']
+    assert all(recipe['is_favorited'] for recipe in results)
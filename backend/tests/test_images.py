@@ -0,0 +1,156 @@
+import base64
+from io import BytesIO, StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from PIL import Image
+
+from core.constants import RECIPE_IMAGE_RENDITIONS
+from core.images import is_raw_image
+from core.renditions import (RENDITIONS_REJECTED, RENDITIONS_UPLOAD,
+                             get_rendition_url)
+from core.storage import ContentAddressedStorage
+from recipes.models import Ingredient, Recipe, Tag
+
+
+def encode_image(color):
+    output = BytesIO()
+    Image.new('RGB', (640, 480), color).save(output, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(output.getvalue()).decode())
+
+
+# Сигнатура PNG проходит проверку при загрузке, а Pillow файл отклоняет.
+BROKEN_IMAGE = ('data:image/png;base64,'
+                + base64.b64encode(b'\x89PNG\r\n\x1a\n' + b'0' * 64).decode())
+
+
+@pytest.fixture
+def create_recipe(client, django_capture_on_commit_callbacks):
+    tag = Tag.objects.create(name='Тег', slug='tag')
+    ingredient = Ingredient.objects.create(name='Соль', measurement_unit='г')
+
+    def create(color='red', image=None, execute=True):
+        with django_capture_on_commit_callbacks(execute=execute):
+            response = client.post('/api/recipes/', {
+                'tags': [tag.id],
+                'ingredients': [{'id': ingredient.id, 'amount': 1}],
+                'image': image or encode_image(color),
+                'name': 'Рецепт', 'text': 'Текст', 'cooking_time': 10,
+            }, format='json')
+        assert response.status_code == 201, response.json()
+        return Recipe.objects.get(pk=response.json()['id'])
+    return create
+
+
+def test_renditions_are_recorded_on_model(client, create_recipe):
+    recipe = create_recipe()
+    assert set(recipe.image_renditions) >= set(RECIPE_IMAGE_RENDITIONS)
+    with mock.patch.object(ContentAddressedStorage, 'exists',
+                           side_effect=AssertionError):
+        data = client.get(f'/api/recipes/{recipe.id}/').json()
+    assert data['srcset'].count(', ') == len(RECIPE_IMAGE_RENDITIONS) - 1
+
+
+def test_replaced_image_has_no_renditions_until_processed(create_recipe):
+    recipe = create_recipe()
+    Recipe.objects.filter(pk=recipe.pk).update(image='recipes/other.jpg')
+    recipe.refresh_from_db()
+    assert recipe.image_renditions
+    with mock.patch.object(ContentAddressedStorage, 'exists',
+                           side_effect=AssertionError):
+        assert get_rendition_url(recipe.image, 'card') is None
+
+
+def test_generate_renditions_records_missing(create_recipe):
+    recipe = create_recipe()
+    created = recipe.image_renditions
+    Recipe.objects.filter(pk=recipe.pk).update(image_renditions={})
+    call_command('generate_renditions', stdout=StringIO())
+    recipe.refresh_from_db()
+    # Хеш исходной загрузки из файла уже не восстановить.
+    del created[RENDITIONS_UPLOAD]
+    assert recipe.image_renditions == created
+    call_command('collect_media_garbage', grace_hours=0, stdout=StringIO())
+    storage = recipe.image.storage
+    assert all(storage.exists(name) for name in created.values())
+
+
+def test_renditions_are_named_by_own_content(create_recipe):
+    first = create_recipe('red').image_renditions
+    second = create_recipe('blue').image_renditions
+    storage = ContentAddressedStorage()
+    for created in (first, second):
+        for rendition in RECIPE_IMAGE_RENDITIONS:
+            with storage.open(created[rendition]) as rendition_file:
+                digest = storage.get_digest(rendition_file)
+            assert digest in created[rendition]
+    assert not set(first.values()) & set(second.values())
+
+
+def test_resent_image_is_kept(client, create_recipe,
+                              django_capture_on_commit_callbacks):
+    recipe = create_recipe('red')
+    name = recipe.image.name
+    data = {
+        'tags': list(recipe.tags.values_list('id', flat=True)),
+        'ingredients': [
+            {'id': item.ingredient_id, 'amount': item.amount}
+            for item in recipe.recipe_ingredients.all()
+        ],
+    }
+
+    def patch(color):
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            response = client.patch(f'/api/recipes/{recipe.id}/',
+                                    {**data, 'image': encode_image(color)},
+                                    format='json')
+        assert response.status_code == 200, response.json()
+        recipe.refresh_from_db()
+        return callbacks
+
+    assert not patch('red')
+    assert recipe.image.name == name
+    patch('blue')
+    assert recipe.image.name != name
+    # Картинку заменили в обход API: прежняя загрузка снова сохраняется.
+    Recipe.objects.filter(pk=recipe.pk).update(image=name)
+    patch('blue')
+    assert recipe.image.name != name
+
+
+def test_rejected_image_keeps_previous(client, create_recipe,
+                                       django_capture_on_commit_callbacks):
+    recipe = create_recipe()
+    name = recipe.image.name
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.patch(f'/api/recipes/{recipe.id}/', {
+            'tags': list(recipe.tags.values_list('id', flat=True)),
+            'ingredients': [{'id': item.ingredient_id, 'amount': item.amount}
+                            for item in recipe.recipe_ingredients.all()],
+            'image': BROKEN_IMAGE,
+        }, format='json')
+    assert response.status_code == 200, response.json()
+    recipe.refresh_from_db()
+    assert recipe.image.name == name
+    assert get_rendition_url(recipe.image, 'card')
+
+
+def test_rejected_first_image_is_hidden(client, create_recipe):
+    recipe = create_recipe(image=BROKEN_IMAGE)
+    assert recipe.image.name
+    assert client.get(f'/api/recipes/{recipe.id}/').json()['image'] is None
+    call_command('process_raw_images', stdout=StringIO())
+    recipe.refresh_from_db()
+    assert recipe.image_renditions == {RENDITIONS_REJECTED: recipe.image.name}
+
+
+def test_process_raw_images_recovers_lost_jobs(create_recipe):
+    # Процесс остановился раньше, чем пул обработал загрузку.
+    recipe = create_recipe(execute=False)
+    assert is_raw_image(recipe.image.name)
+    call_command('process_raw_images', stdout=StringIO())
+    recipe.refresh_from_db()
+    assert not is_raw_image(recipe.image.name)
+    assert set(recipe.image_renditions) >= set(RECIPE_IMAGE_RENDITIONS)
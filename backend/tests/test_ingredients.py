@@ -0,0 +1,70 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.filters import IngredientFilter
+from recipes.ingredient_index import get_ingredient_index
+from recipes.models import Ingredient
+from recipes.search import limit_search_results
+
+NAMES = (
+    ('абрикос', 'г'), ('сахар', 'г'), ('сахарная пудра', 'г'),
+    ('тростниковый сахар', 'г'), ('Сахар ванильный', 'г'),
+    ('сахар', 'шт.'), ('Буррата', 'г'), ('буррата мини', 'г'),
+    ('ёжевика', 'г'), ('Ёлочная хвоя', 'г'), ('ликер Baileys', 'мл'),
+    ('BAILEYS', 'мл'), ('Straße Brot', 'г'), ('100% какао', 'г'),
+    ('соль_морская', 'г'), ('Zucchini', 'г'), ('zest', 'г'),
+)
+QUERIES = (
+    'сах', 'Сах', 'сахар', 'САХАР', 'с', 'ар', 'бур', 'Бу', 'ё', 'Ё',
+    'ёлоч', 'bai', 'BaI', 'ß', 'strasse', 'STRAßE', '%', '_', 'z',
+    ' сахар ', 'нет такого',
+)
+
+
+@pytest.fixture
+def ingredients(db):
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit=unit)
+        for name, unit in NAMES
+    )
+
+
+@pytest.mark.parametrize('name, status', (('сах', 200), ('abc', 404)))
+def test_detail_with_search_param(ingredients, name, status):
+    # Фильтры применяются и к detail-маршруту, но без среза выборки.
+    ingredient = Ingredient.objects.get(name='сахарная пудра')
+    response = APIClient().get(f'/api/ingredients/{ingredient.id}/',
+                               {'name': name})
+    assert response.status_code == status
+
+
+def test_search_prefix_matches_first(ingredients):
+    response = APIClient().get('/api/ingredients/', {'name': 'сахар'})
+    assert response.status_code == 200
+    assert [item['name'] for item in response.json()] == [
+        'Сахар ванильный', 'сахар', 'сахар', 'сахарная пудра',
+        'тростниковый сахар'
+    ]
+
+
+@pytest.mark.parametrize('measurement_unit', (None, 'г'))
+@pytest.mark.parametrize('query', QUERIES)
+def test_index_matches_orm_filter(ingredients, query, measurement_unit):
+    params = {'name': query}
+    if measurement_unit:
+        params['measurement_unit'] = measurement_unit
+    expected = [
+        {'id': ingredient.id, 'name': ingredient.name,
+         'measurement_unit': ingredient.measurement_unit}
+        for ingredient in limit_search_results(IngredientFilter(
+            params, queryset=Ingredient.objects.all()).qs)
+    ]
+    response = APIClient().get('/api/ingredients/', params)
+    assert response.json() == expected
+
+
+def test_index_follows_version(ingredients):
+    assert get_ingredient_index().search('морков') == []
+    Ingredient.objects.create(name='морковь', measurement_unit='г')
+    assert [item['name'] for item in
+            get_ingredient_index().search('морков')] == ['морковь']
@@ -0,0 +1,79 @@
+"""Верхние границы числа запросов к БД на эндпоинтах рецептов.
+
+Число запросов не должно зависеть ни от размера страницы, ни от
+числа ингредиентов в рецепте.
+"""
+import pytest
+from rest_framework.test import APIClient
+
+RECIPE_LIST_MAX_QUERIES = 11
+ANONYMOUS_RECIPE_LIST_MAX_QUERIES = 5
+RECIPE_DETAIL_MAX_QUERIES = 5
+RECIPE_UPDATE_MAX_QUERIES = 21
+
+
+@pytest.mark.parametrize('ingredients', (1, 10, 30))
+@pytest.mark.parametrize('limit', (1, 6, 20))
+def test_recipe_list_queries(client, make_recipes,
+                             django_assert_max_num_queries,
+                             limit, ingredients):
+    make_recipes(20, ingredients)
+    with django_assert_max_num_queries(RECIPE_LIST_MAX_QUERIES):
+        response = client.get('/api/recipes/', {'limit': limit})
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == limit
+    assert all(len(recipe['ingredients']) == ingredients
+               for recipe in results)
+
+
+@pytest.mark.parametrize('ingredients', (1, 10, 30))
+def test_recipe_detail_queries(client, make_recipes,
+                               django_assert_max_num_queries, ingredients):
+    recipe, = make_recipes(1, ingredients)
+    with django_assert_max_num_queries(RECIPE_DETAIL_MAX_QUERIES):
+        response = client.get(f'/api/recipes/{recipe.id}/')
+    assert response.status_code == 200
+    assert len(response.json()['ingredients']) == ingredients
+
+
+@pytest.mark.parametrize('limit', (1, 6, 20))
+def test_anonymous_recipe_list_queries(make_recipes,
+                                       django_assert_max_num_queries, limit):
+    make_recipes(20)
+    with django_assert_max_num_queries(ANONYMOUS_RECIPE_LIST_MAX_QUERIES):
+        response = APIClient().get('/api/recipes/', {'limit': limit})
+    assert response.status_code == 200
+    assert len(response.json()['results']) == limit
+
+
+@pytest.mark.parametrize('removed', (1, 10, 29))
+def test_recipe_update_queries(client, make_recipes,
+                               django_assert_max_num_queries, removed):
+    recipe, = make_recipes(1, 30)
+    items = list(recipe.recipe_ingredients.order_by('ingredient_id'))
+    data = {
+        'tags': list(recipe.tags.values_list('id', flat=True)),
+        'ingredients': [{'id': item.ingredient_id, 'amount': 2}
+                        for item in items[removed:]],
+    }
+    with django_assert_max_num_queries(RECIPE_UPDATE_MAX_QUERIES):
+        response = client.patch(f'/api/recipes/{recipe.id}/', data,
+                                format='json')
+    assert response.status_code == 200, response.json()
+    assert len(response.json()['ingredients']) == 30 - removed
+
+
+def test_ingredient_delete_outside_update_touches_recipe(client,
+                                                         make_recipes):
+    recipe, = make_recipes(1, 3)
+    client.patch(f'/api/recipes/{recipe.id}/', {
+        'tags': list(recipe.tags.values_list('id', flat=True)),
+        'ingredients': [{'id': recipe.recipe_ingredients.first().ingredient_id,
+                         'amount': 2}],
+    }, format='json')
+    recipe.refresh_from_db()
+    updated_at = recipe.updated_at
+    recipe.recipe_ingredients.get().delete()
+    recipe.refresh_from_db()
+    assert recipe.updated_at > updated_at
@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.mark.parametrize('field', ('tags', 'ingredients'))
+@pytest.mark.parametrize('pk', (0, 2 ** 63, 2 ** 70))
+def test_recipe_rejects_ids_out_of_range(client, make_recipes, field, pk):
+    recipe, = make_recipes(1, 1)
+    data = {
+        'tags': list(recipe.tags.values_list('id', flat=True)),
+        'ingredients': [{'id': recipe.recipe_ingredients.get().ingredient_id,
+                         'amount': 1}],
+    }
+    data[field] = [pk] if field == 'tags' else [{'id': pk, 'amount': 1}]
+    response = client.patch(f'/api/recipes/{recipe.id}/', data,
+                            format='json')
+    assert response.status_code == 400
+    assert field in response.json()
@@ -0,0 +1,48 @@
+import pytest
+
+from recipes.models import Recipe
+
+BULK_RELATIONS_MAX_QUERIES = 15
+
+
+@pytest.mark.parametrize('url', ('/api/recipes/bulk/favorite/',
+                                 '/api/recipes/bulk/shopping_cart/'))
+@pytest.mark.parametrize('count', (1, 10, 50))
+def test_bulk_relations_queries(client, make_recipes,
+                                django_assert_max_num_queries, url, count):
+    ids = [recipe.id for recipe in make_recipes(count, ingredients=5)]
+    for method in (client.post, client.delete):
+        with django_assert_max_num_queries(BULK_RELATIONS_MAX_QUERIES):
+            response = method(url, {'ids': ids}, format='json')
+        assert response.status_code == 200
+        assert all(result['status'] in (201, 204)
+                   for result in response.json()['results'])
+
+
+def test_bulk_relations_side_effects(client, user, make_recipes):
+    ids = [recipe.id for recipe in make_recipes(3, ingredients=2)]
+    client.post('/api/recipes/bulk/favorite/', {'ids': ids}, format='json')
+    client.post('/api/recipes/bulk/shopping_cart/', {'ids': ids},
+                format='json')
+    assert set(Recipe.objects.values_list('favorites_count', flat=True)) == {1}
+    assert {(item.ingredient_id, item.total_amount)
+            for item in user.shopping_list_items.all()} == {
+        (ingredient_id, 3) for ingredient_id in
+        Recipe.objects.get(pk=ids[0]).ingredients.values_list('id', flat=True)
+    }
+    client.delete('/api/recipes/bulk/favorite/', {'ids': ids[:2]},
+                  format='json')
+    client.delete('/api/recipes/bulk/shopping_cart/', {'ids': ids[:2]},
+                  format='json')
+    assert sorted(Recipe.objects.values_list(
+        'favorites_count', flat=True)) == [0, 0, 1]
+    assert set(user.shopping_list_items.values_list(
+        'total_amount', flat=True)) == {1}
+
+
+@pytest.mark.parametrize('pk', (2 ** 63, 2 ** 70))
+def test_bulk_relations_reject_ids_out_of_range(client, pk):
+    response = client.post('/api/recipes/bulk/favorite/', {'ids': [pk]},
+                           format='json')
+    assert response.status_code == 400
+    assert 'ids' in response.json()
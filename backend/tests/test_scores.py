@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.service import get_scores_anchor, refresh_recipe_scores
+
+ANCHOR = get_scores_anchor(datetime(2026, 10, 1, tzinfo=timezone.utc))
+
+
+@pytest.fixture
+def recipes(make_recipes):
+    return make_recipes(3, ingredients=1)
+
+
+def add_event(model, user, recipe, created_at):
+    model.objects.create(user=user, recipe=recipe)
+    model.objects.filter(user=user, recipe=recipe).update(
+        created_at=created_at)
+
+
+def get_scores():
+    return {pk: (popularity, trending) for pk, popularity, trending in
+            Recipe.objects.values_list('pk', 'popularity', 'trending')}
+
+
+def test_incremental_refresh_matches_full(make_user, recipes):
+    first, second, third = recipes
+    users = [make_user(f'user{i}') for i in range(3)]
+    for number, user in enumerate(users):
+        add_event(Favorite, user, first, ANCHOR - timedelta(days=number))
+        add_event(ShoppingCart, user, second, ANCHOR + timedelta(hours=1))
+    refresh_recipe_scores(ANCHOR + timedelta(hours=2))
+    Favorite.objects.filter(user=users[0]).delete()
+    add_event(Favorite, users[1], third, ANCHOR + timedelta(hours=3))
+    now = ANCHOR + timedelta(hours=4)
+    assert refresh_recipe_scores(now) == 2
+    incremental = get_scores()
+    refresh_recipe_scores(now, full=True)
+    assert incremental == {pk: pytest.approx(scores)
+                           for pk, scores in get_scores().items()}
+    assert (incremental[second.pk] > incremental[first.pk]
+            > incremental[third.pk])
+
+
+def test_unchanged_recipes_are_not_recomputed(make_user, recipes):
+    user = make_user('fan')
+    add_event(Favorite, user, recipes[0], ANCHOR)
+    refresh_recipe_scores(ANCHOR + timedelta(hours=1))
+    Recipe.objects.filter(pk=recipes[0].pk).update(popularity=100)
+    add_event(Favorite, user, recipes[1], ANCHOR + timedelta(hours=1))
+    refresh_recipe_scores(ANCHOR + timedelta(hours=2))
+    scores = get_scores()
+    assert scores[recipes[0].pk][0] == 100
+    assert scores[recipes[1].pk][0] > 0
+
+
+def test_events_leave_trending_window(make_user, recipes):
+    add_event(Favorite, make_user('fan'), recipes[0],
+              ANCHOR - timedelta(days=7) + timedelta(minutes=30))
+    refresh_recipe_scores(ANCHOR + timedelta(minutes=10))
+    assert get_scores()[recipes[0].pk][1] > 0
+    refresh_recipe_scores(ANCHOR + timedelta(hours=1))
+    popularity, trending = get_scores()[recipes[0].pk]
+    assert popularity > 0 and trending == 0
@@ -0,0 +1,23 @@
+import pytest
+from rest_framework.test import APIClient
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+@pytest.mark.parametrize('params, accept', (
+    ({}, 'application/pdf'),
+    ({'format': 'csv'}, None),
+    ({}, 'image/png'),
+))
+def test_errors_are_sent_as_json(db, params, accept):
+    headers = {'HTTP_ACCEPT': accept} if accept else {}
+    response = APIClient().get(URL, params, **headers)
+    assert response.status_code in (401, 406)
+    assert response['Content-Type'] == 'application/json'
+    assert 'detail' in response.json()
+
+
+def test_list_is_sent_in_requested_format(client):
+    response = client.get(URL, {'format': 'csv'})
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/csv')
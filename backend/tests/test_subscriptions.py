@@ -0,0 +1,11 @@
+from users.models import Subscribe
+
+
+def test_is_subscribed_is_not_cached_between_requests(client, user,
+                                                      make_user):
+    author = make_user('author')
+    url = f'/api/users/{author.id}/'
+    assert client.get(url).json()['is_subscribed'] is False
+    # Как из другого процесса: сигналы этого процесса не срабатывают.
+    Subscribe.objects.bulk_create([Subscribe(user=user, author=author)])
+    assert client.get(url).json()['is_subscribed'] is True
@@ -5,17 +5,20 @@ from django.contrib.auth.models import Group
 from django.utils.safestring import mark_safe
 from rest_framework.authtoken.models import TokenProxy
 
+from core.admin import EstimatedCountAdminMixin
+from core.renditions import get_rendition_url
+
 from .models import Subscribe
 
 User = get_user_model()
 
 
 @admin.register(User)
-class UsersAdmin(UserAdmin):
+class UsersAdmin(EstimatedCountAdminMixin, UserAdmin):
     """Админка для пользователя."""
 
     list_display = ('id', 'full_name', 'username', 'email', 'avatar_tag',
-                    'recipe_count', 'subscriber_count', 'is_staff')
+                    'recipes_count', 'subscribers_count', 'is_staff')
     search_fields = ('username', 'email')
     search_help_text = 'Поиск по `username` и `email`'
     list_display_links = ('id', 'username', 'email', 'full_name')
@@ -27,23 +30,22 @@ class UsersAdmin(UserAdmin):
     @admin.display(description='Аватар')
     def avatar_tag(self, user):
         if user.avatar:
-            return mark_safe(f'<img src="{user.avatar.url}"'
+            url = get_rendition_url(user.avatar, 'thumb') or user.avatar.url
+            return mark_safe(f'<img src="{url}"'
                              'style="border-radius: 50%; object-fit: cover; '
                              'width="80" height="60">')
         return 'Нет аватара'
 
-    @admin.display(description='Кол-во рецептов')
-    def recipe_count(self, user):
-        return user.recipes.count()
-
-    @admin.display(description='Кол-во подписчиков')
-    def subscriber_count(self, user):
-        return user.subscriptions_to_author.count()
-
 
 @admin.register(Subscribe)
-class SubscribeAdmin(admin.ModelAdmin):
+class SubscribeAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+
+    def get_readonly_fields(self, request, obj=None):
+        # Смена автора в готовой подписке обошла бы пересчёт счётчиков.
+        return ('user', 'author') if obj else ()
     search_fields = ('user__username', 'author__username')
 
 
@@ -2,13 +2,17 @@ from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.db import models
 
+from core.counters import CounterFieldsMixin
+from core.storage import content_storage
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username',
                        'first_name',
                        'last_name')
+    counter_fields = ('recipes_count', 'subscribers_count')
     email = models.EmailField(verbose_name='Электронная почта',
                               unique=True)
     first_name = models.CharField(blank=False, max_length=128)
@@ -16,9 +20,19 @@ class User(AbstractUser):
     avatar = models.ImageField(
         'Аватар',
         upload_to='avatars/',
+        storage=content_storage,
         blank=True,
         null=True
     )
+    avatar_renditions = models.JSONField(
+        'Копии аватара', default=dict, blank=True, editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        'Кол-во рецептов', default=0, editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        'Кол-во подписчиков', default=0, editable=False
+    )
 
     class Meta:
         ordering = ('username', 'pk')
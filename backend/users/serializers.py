@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
 from djoser.serializers import UserSerializer as DjoserUserSerializer
-from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
 
+from core.images import Base64ImageField
+from users.service import get_subscribed_author_ids
+
 User = get_user_model()
 
 
@@ -14,9 +16,7 @@ class UserSerializer(DjoserUserSerializer):
         fields = DjoserUserSerializer.Meta.fields + ('is_subscribed', 'avatar')
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return (user.is_authenticated
-                and user.user_subscriptions.filter(author=obj).exists())
+        return obj.id in get_subscribed_author_ids(self.context['request'])
 
 
 class AvatarSerializer(serializers.ModelSerializer):
@@ -0,0 +1,90 @@
+from hashlib import sha256
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models.fields.files import FieldFile
+
+from core.constants import AUTH_TOKEN_CACHE_TIMEOUT
+
+User = get_user_model()
+
+AUTH_TOKEN_KEY = 'auth-token:{}'
+AUTH_VERSION_KEY = 'auth-version:{}'
+# Поля пользователя, которые читают представления; пароля среди них нет.
+AUTH_USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name',
+                    'avatar', 'avatar_renditions', 'is_active', 'is_staff',
+                    'is_superuser')
+
+
+def get_subscribed_author_ids(request):
+    """Id авторов, на которых подписан пользователь, один раз за запрос.
+
+    Между запросами множество не хранится: кеш по умолчанию у каждого
+    процесса свой, и сброс в одном воркере не виден остальным.
+    """
+    author_ids = getattr(request, '_subscribed_author_ids', None)
+    if author_ids is None:
+        user = request.user
+        author_ids = set()
+        if user.is_authenticated:
+            author_ids = set(user.user_subscriptions.values_list(
+                'author_id', flat=True))
+        request._subscribed_author_ids = author_ids
+    return author_ids
+
+
+def get_token_cache_key(token_key):
+    # Сам токен в ключ кеша не попадает.
+    return AUTH_TOKEN_KEY.format(sha256(token_key.encode()).hexdigest())
+
+
+def get_auth_version(user_id):
+    """Метка учётной записи в общем кеше.
+
+    Метку стирает любое сохранение или удаление пользователя и удаление
+    его токена (bump_auth_version). Стёртая или вытесненная метка
+    заводится заново со случайным значением, поэтому закешированные с
+    прежней меткой токены проверяются по БД.
+    """
+    key = AUTH_VERSION_KEY.format(user_id)
+    cache.add(key, uuid4().hex, AUTH_TOKEN_CACHE_TIMEOUT)
+    return cache.get(key)
+
+
+def get_cached_auth_version(user_id):
+    return cache.get(AUTH_VERSION_KEY.format(user_id))
+
+
+def bump_auth_version(user_id):
+    """Сбрасывает метку сейчас и ещё раз после фиксации транзакции.
+
+    Второй сброс нужен, если до фиксации параллельный запрос успел
+    прочитать из БД прежние данные и закешировать их с новой меткой.
+    """
+    key = AUTH_VERSION_KEY.format(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_user_snapshot(user):
+    """Поля AUTH_USER_FIELDS пользователя для кеша токенов."""
+    snapshot = {}
+    for name in AUTH_USER_FIELDS:
+        value = getattr(user, name)
+        snapshot[name] = value.name if isinstance(value, FieldFile) else value
+    return snapshot
+
+
+def restore_user(snapshot):
+    """Пользователь из снимка без запросов к БД.
+
+    Остальные поля, в том числе пароль и счётчики, отложены: при
+    обращении они читаются из БД, а save() их не перезаписывает.
+    """
+    # from_db ждёт значения в порядке полей модели.
+    field_names = [field.attname for field in User._meta.concrete_fields
+                   if field.attname in snapshot]
+    return User.from_db(router.db_for_read(User), field_names,
+                        [snapshot[name] for name in field_names])
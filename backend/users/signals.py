@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.constants import AVATAR_RENDITIONS
+from core.counters import add_to_counters, change_counter
+from core.images import schedule_image_processing
+from core.relations import get_counter_deltas, relations_changed
+from users.models import Subscribe
+from users.service import bump_auth_version
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def process_avatar(sender, instance, **kwargs):
+    schedule_image_processing(instance, 'avatar', AVATAR_RENDITIONS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reset_auth_version(sender, instance, **kwargs):
+    bump_auth_version(instance.pk)
+
+
+@receiver(post_save, sender=Subscribe)
+def increment_subscribers_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'subscribers_count', 1)
+
+
+@receiver(post_delete, sender=Subscribe)
+def decrement_subscribers_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'subscribers_count', -1)
+
+
+@receiver(relations_changed, sender=Subscribe)
+def change_subscribers_counts(sender, instances, action, **kwargs):
+    add_to_counters(User, 'subscribers_count',
+                    get_counter_deltas(instances, 'author_id', action))
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    bump_auth_version(instance.user_id)